@@ -0,0 +1,86 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Match transactions against a set of addresses
+
+The addresses are normalized to 20 bytes and kept in a hashed set,
+so matching a transaction costs the same for one or for 10k addresses.
+"""
+import hashlib
+
+
+def address_to_bytes(address) -> bytes:
+    """Normalize an address to 20 bytes
+
+    address = hex string (with or without 0x, any case), bytes or None
+    returns None for an empty address (contract creation)
+    """
+    if not address:
+        return None
+    if isinstance(address, str):
+        if address[:2] in ('0x', '0X'):
+            address = address[2:]
+        return bytes.fromhex(address)
+    return bytes(address)
+
+
+def address_to_hex(address: bytes) -> str:
+    """Lowercase hex string of a 20 byte address
+    """
+    return '0x' + address.hex()
+
+
+def read_address_file(path: str) -> list:
+    """Read addresses from a file, one address per line
+
+    Empty lines and text after a # are skipped
+    """
+    addresses = []
+    with open(path, 'r') as afile:
+        for line in afile:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                addresses.append(line)
+    return addresses
+
+
+class AddressMatcher():
+    """
+    Match the from and to address of transactions against a set of addresses
+
+    addresses = list of addresses (hex strings or bytes)
+    """
+
+    def __init__(self, addresses: list):
+        self.addresses = frozenset(address_to_bytes(addr) for addr in addresses if addr)
+        for addr in self.addresses:
+            if len(addr) != 20:
+                raise ValueError('Invalid address: %s' % address_to_hex(addr))
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def match(self, tx) -> list:
+        """Get the tracked addresses of a transaction
+
+        tx = transaction with 'from' and 'to' keys
+        returns list of matching addresses as bytes, empty when nothing matches
+        """
+        matches = []
+        from_addr = address_to_bytes(tx['from'])
+        if from_addr in self.addresses:
+            matches.append(from_addr)
+        to_addr = address_to_bytes(tx['to'])
+        if to_addr in self.addresses and to_addr != from_addr:
+            matches.append(to_addr)
+        return matches
+
+    def digest(self) -> str:
+        """Hash of the set of addresses, to recognize the same set in a checkpoint
+        """
+        sha = hashlib.sha1()
+        for addr in sorted(self.addresses):
+            sha.update(addr)
+        return sha.hexdigest()
@@ -0,0 +1,227 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Asyncio request URL Helper to get response from API
+
+Same as RequestHelper, but many requests can be in flight on one thread.
+One aiohttp session keeps pooled keep-alive connections per host,
+the number of connections (requests in flight) per host is capped.
+Requests are paced by the same per host token buckets as RequestHelper.
+Identical requests in flight at the same moment are coalesced into one request.
+Metrics are collected as in RequestHelper when a RequestMetrics is given.
+
+usage:
+    async with AsyncRequestHelper() as req:
+        resps = await asyncio.gather(*[req.get_request_response(url) for url in urls])
+"""
+import asyncio
+import copy
+import json
+import time
+
+import aiohttp
+
+from RequestHelper import RequestHelper, get_rate_limiter, retry_after_time
+
+
+class AsyncRequestHelper():
+    """
+    Async functions to help requesting response from an API
+
+    limit_per_host = maximum number of requests in flight per host
+    metrics = optional RequestMetrics to collect request metrics
+    The retries are the same as the Retry of RequestHelper._init_session
+    """
+
+    retry_total = 5
+    retry_backoff_factor = 1.5
+    retry_backoff_max = 120
+    retry_status_forcelist = (502, 503, 504)
+
+    def __init__(self, limit_per_host: int = 10, metrics=None):
+        self.limit_per_host = limit_per_host
+        self.metrics = metrics
+        self.headers = {}
+        self.session = None
+        self.in_flight = {}
+        self.coalesced = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _init_session(self):
+        """
+        Initialization of the session, must be called inside the event loop
+        """
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.limit_per_host)
+        return aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                     timeout=aiohttp.ClientTimeout(total=120))
+
+    def update_header(self, params: dict):
+        """Update the header of the session
+
+        params = dictionary with parameters for the header
+        """
+        self.headers.update(params)
+        if self.session is not None:
+            self.session.headers.update(params)
+
+    def _backoff_time(self, retry: int) -> float:
+        """Sleep time before a retry, as urllib3 Retry: no sleep for the first retry
+        """
+        if retry <= 1:
+            return 0
+        return min(self.retry_backoff_factor * 2**(retry - 1), self.retry_backoff_max)
+
+    async def _get(self, url):
+        """Get the response of an url with retries on connection errors and
+        status codes in the forcelist
+
+        returns tuple (response, body)
+        """
+        if self.session is None:
+            self.session = self._init_session()
+        retry = 0
+        start = time.monotonic()
+        while True:
+            try:
+                async with self.session.get(url) as response:
+                    body = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                retry += 1
+                if retry > self.retry_total:
+                    if self.metrics is not None:
+                        self.metrics.record_request(url, time.monotonic() - start, None,
+                                                    retries=retry - 1)
+                    raise
+                await asyncio.sleep(self._backoff_time(retry))
+                continue
+
+            if response.status in self.retry_status_forcelist and retry < self.retry_total:
+                retry += 1
+                sleep_time = self._backoff_time(retry)
+                if 'Retry-After' in response.headers:
+                    sleep_time = int(response.headers['Retry-After'])
+                await asyncio.sleep(sleep_time)
+                continue
+            if self.metrics is not None:
+                self.metrics.record_request(url, time.monotonic() - start, response.status,
+                                            len(body), retry)
+            return response, body
+
+    async def get_request_response(self, url) -> dict:
+        """general request url function, identical requests in flight are coalesced
+
+        url = api url for request
+        returns the same dictionary as RequestHelper.get_request_response
+        """
+        entry = self.in_flight.get(url)
+        leader = entry is None
+        if leader:
+            # [task, number of waiting callers]
+            entry = [asyncio.ensure_future(self._get_request_response(url)), 0]
+            self.in_flight[url] = entry
+            entry[0].add_done_callback(lambda _: self._done(url, entry))
+        else:
+            entry[1] += 1
+            self.coalesced += 1
+
+        # a cancelled caller does not cancel the request of the other callers
+        resp = await asyncio.shield(entry[0])
+        if not leader:
+            return copy.deepcopy(resp)
+        # no caller can join after the request is removed from in_flight,
+        # the leader gets a copy too when waiting callers copy the shared response
+        self._done(url, entry)
+        return copy.deepcopy(resp) if entry[1] else resp
+
+    def _done(self, url, entry):
+        """Remove a finished request from in_flight, not a newer request of the same url
+        """
+        if self.in_flight.get(url) is entry:
+            del self.in_flight[url]
+
+    async def _get_request_response(self, url) -> dict:
+        """general request url function
+
+        url = api url for request
+        returns the same dictionary as RequestHelper.get_request_response
+        """
+        resp = {}
+        response = None
+        body = b''
+        limiter = get_rate_limiter(url)
+        retry = 0
+
+        try:
+            while True:
+                if limiter:
+                    wait = await limiter.acquire_async()
+                    if self.metrics is not None:
+                        self.metrics.record_sleep(url, wait)
+                response, body = await self._get(url)
+                if response.status == 429:
+                    retry += 1
+                    if retry > RequestHelper.retry_429:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, headers=response.headers)
+                    sleep_time = retry_after_time(response, retry)
+                    print('429 Too Many Requests, retrying in %s s' % (sleep_time))
+                    # pause the shared bucket, the other tasks wait too
+                    limiter = get_rate_limiter(url, create=True)
+                    limiter.pause(sleep_time)
+                else:
+                    break
+        except Exception:
+            if response is not None:
+                print('Exception:', response.headers)
+                print(body)
+            raise
+
+        try:
+            # get json from response, with type dict (mostly) or type list (Alcor exchange)
+            resp_unknown = json.loads(body)
+
+            # when return type is a list, convert to dict
+            if isinstance(resp_unknown, list):
+                resp.update({'result': resp_unknown})
+            else:
+                resp = resp_unknown
+
+        except Exception as e:
+            print('JSON Exception: ', e)
+
+        try:
+            response.raise_for_status()
+            resp.update({'status_code': response.status})
+
+        except aiohttp.ClientResponseError as e:
+            print('No status Exception: ', e)
+
+            # check if error key is in result dictionary
+            if 'error' in resp:
+                resp.update({'status_code': 'error'})
+            else:
+                resp.update({'status_code': 'no status'})
+
+        except Exception as e:
+            print('Other Exception: ', e)
+            resp.update({'status_code': 'error'})
+            resp.update({'prices': []})
+
+        return resp
+
+    api_url_params = RequestHelper.api_url_params
+
+    async def close(self):
+        """Close the session and its connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,89 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Native balances of many addresses with few requests
+
+1: EtherscanBalanceService
+Etherscan compatible api, balancemulti with up to 20 addresses per request
+
+2: RpcBalanceService
+Web3 http provider, JSON-RPC batches of eth_getBalance calls
+
+Both return one dictionary with address: balance in wei,
+with the addresses as given by the caller
+
+usage:
+    balances = RpcBalanceService(config.ETH_HTTP_PROVIDER).get_balances(addresses)
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from EtherscanFetcher import EtherscanFetcher
+from W3BatchRequest import BatchRpcClient, quantity_to_int
+
+
+def chunks(items: list, size: int):
+    """Split a list in lists of at most size items
+    """
+    return [items[idx:idx + size] for idx in range(0, len(items), size)]
+
+
+class EtherscanBalanceService():
+    """
+    Balances through the balancemulti action of an Etherscan compatible api
+
+    fetcher = EtherscanFetcher for the requests, a new one by default
+    group_size = number of addresses per request, Etherscan accepts up to 20
+    workers = number of requests at the same time (paced by the rate limiter)
+    """
+
+    def __init__(self, fetcher: EtherscanFetcher = None, group_size: int = 20, workers: int = 4):
+        self.fetcher = fetcher or EtherscanFetcher()
+        self.group_size = group_size
+        self.workers = workers
+
+    def get_group_balances(self, addresses: list) -> dict:
+        """Balances of one group of addresses, one request
+        """
+        result = self.fetcher.get_result({'module': 'account', 'action': 'balancemulti',
+                                          'address': ','.join(addresses), 'tag': 'latest'})
+        balances = {item['account'].lower(): int(item['balance']) for item in result}
+        return {address: balances[address.lower()] for address in addresses}
+
+    def get_balances(self, addresses: list) -> dict:
+        """Balances in wei of a list of addresses
+        """
+        balances = {}
+        groups = chunks(list(dict.fromkeys(addresses)), self.group_size)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for group_balances in executor.map(self.get_group_balances, groups):
+                balances.update(group_balances)
+        return balances
+
+
+class RpcBalanceService():
+    """
+    Balances through JSON-RPC batches of eth_getBalance calls
+
+    endpoint = url of the http provider, a W3ProviderPool or a BatchRpcClient
+    batch_size = number of calls per http request
+    """
+
+    def __init__(self, endpoint, batch_size: int = 100):
+        if isinstance(endpoint, BatchRpcClient):
+            self.client = endpoint
+        else:
+            self.client = BatchRpcClient(endpoint, batch_size)
+
+    def get_balances(self, addresses: list, block='latest') -> dict:
+        """Balances in wei of a list of addresses
+
+        block = block number or tag of the balances
+        """
+        if not isinstance(block, str):
+            block = hex(block)
+        addresses = list(dict.fromkeys(addresses))
+        results = self.client.request([('eth_getBalance', [address, block])
+                                       for address in addresses])
+        return {address: quantity_to_int(result) for address, result in zip(addresses, results)}
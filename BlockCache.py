@@ -0,0 +1,183 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Local block store in a sqlite database
+
+Finalized blocks never change, so a block fetched once can be read from
+disk in a next scan. Blocks are keyed by block number (header or full block)
+and stored as compressed json together with the block hash.
+
+Blocks within finality_depth of the chain head can still change by a reorg,
+these are stored as not final and removed when the cache is opened again.
+When the total size exceeds max_bytes, the least recently used blocks are removed.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# number of variables per IN (...) query, below SQLITE_MAX_VARIABLE_NUMBER of old builds (999)
+QUERY_SLICE = 500
+
+
+class BlockCache():
+    """
+    Sqlite block store with size limit and hit/miss counters
+
+    path = path of the sqlite database
+    max_bytes = maximum size of the stored (compressed) blocks
+    finality_depth = blocks closer than this to the chain head are not final
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024**3, finality_depth: int = 64):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.finality_depth = finality_depth
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reorg_removed = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS blocks (
+                                number INTEGER NOT NULL,
+                                full INTEGER NOT NULL,
+                                hash TEXT NOT NULL,
+                                final INTEGER NOT NULL,
+                                size INTEGER NOT NULL,
+                                accessed REAL NOT NULL,
+                                data BLOB NOT NULL,
+                                PRIMARY KEY (number, full))''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS blocks_accessed ON blocks (accessed)')
+        # blocks which were not final at the previous run may be reorged
+        cur = self.conn.execute('DELETE FROM blocks WHERE final = 0')
+        self.reorg_removed = cur.rowcount
+        self.conn.commit()
+        self.total_bytes = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM blocks').fetchone()[0]
+
+    def get_blocks(self, block_numbers, full_transactions=True) -> dict:
+        """Read blocks from the cache
+
+        returns dictionary with block number: block, for the blocks found
+        """
+        block_numbers = list(block_numbers)
+        found = {}
+        with self.lock:
+            for idx in range(0, len(block_numbers), QUERY_SLICE):
+                part = block_numbers[idx:idx + QUERY_SLICE]
+                rows = self.conn.execute(
+                    'SELECT number, data FROM blocks WHERE full = ? AND number IN (%s)' %
+                    ','.join('?' * len(part)), [int(full_transactions)] + part)
+                for number, data in rows:
+                    found[number] = json.loads(zlib.decompress(data))
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    'UPDATE blocks SET accessed = ? WHERE number = ? AND full = ?',
+                    [(now, number, int(full_transactions)) for number in found])
+                self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(block_numbers) - len(found)
+        return found
+
+    def put_blocks(self, blocks: dict, head_block: int, full_transactions=True):
+        """Store blocks in the cache
+
+        blocks = dictionary with block number: block
+        head_block = current chain head, to mark recent blocks as not final
+        """
+        now = time.time()
+        rows = []
+        for number, block in blocks.items():
+            if block is None:
+                continue
+            data = zlib.compress(json.dumps(block, separators=(',', ':')).encode('utf-8'))
+            final = number <= head_block - self.finality_depth
+            rows.append((number, int(full_transactions), block['hash'], int(final),
+                         len(data), now, data))
+        if not rows:
+            return
+        with self.lock:
+            old_size = 0
+            for idx in range(0, len(rows), QUERY_SLICE):
+                part = [row[0] for row in rows[idx:idx + QUERY_SLICE]]
+                old_size += self.conn.execute(
+                    'SELECT COALESCE(SUM(size), 0) FROM blocks WHERE full = ? AND number IN (%s)' %
+                    ','.join('?' * len(part)), [int(full_transactions)] + part).fetchone()[0]
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self.total_bytes += sum(row[4] for row in rows) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Remove least recently used blocks until the size is 90% of max_bytes
+        """
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute(
+            'SELECT number, full, size FROM blocks ORDER BY accessed')
+        remove = []
+        for number, full, size in rows:
+            if self.total_bytes <= target:
+                break
+            remove.append((number, full))
+            self.total_bytes -= size
+        self.conn.executemany('DELETE FROM blocks WHERE number = ? AND full = ?', remove)
+        self.evictions += len(remove)
+
+    def report(self) -> str:
+        """Hit/miss report for the end of a run
+        """
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return ('Block cache: %d hits, %d misses (%.1f%% hit rate), %d evicted, '
+                '%d not final removed at start, %.1f MB stored' %
+                (self.hits, self.misses, rate, self.evictions, self.reorg_removed,
+                 self.total_bytes / 1024**2))
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedBlockSource():
+    """
+    Block source which reads from a BlockCache first,
+    and fetches the missing blocks from the source
+
+    source = block source with a get_blocks_by_number function
+    cache = BlockCache
+    head_block = current chain head
+    """
+
+    def __init__(self, source, cache: BlockCache, head_block: int):
+        self.source = source
+        self.cache = cache
+        self.head_block = head_block
+
+    def get_blocks(self, start_block: int, end_block: int, full_transactions=True) -> list:
+        """Get all blocks in the range [start_block, end_block)
+        """
+        return self.get_blocks_by_number(range(start_block, end_block), full_transactions)
+
+    def get_blocks_by_number(self, block_numbers, full_transactions=True) -> list:
+        """Get the blocks with the given numbers
+        """
+        block_numbers = list(block_numbers)
+        blocks = self.cache.get_blocks(block_numbers, full_transactions)
+        missing = [number for number in block_numbers if number not in blocks]
+        if missing:
+            fetched = dict(zip(missing, self.source.get_blocks_by_number(missing, full_transactions)))
+            self.cache.put_blocks(fetched, self.head_block, full_transactions)
+            blocks.update(fetched)
+        return [blocks[number] for number in block_numbers]
@@ -8,12 +8,16 @@ Lookup the meaning of the method_id from a transactions
 1: get_method4byte_dir(txMethod_id)
 First way is through the dictionary site 4bytes
 There is possibility that multiple functions are returned
+The signatures are kept in a local store (SignatureStore), the site is
+only asked once for each new method_id. An offline index of a signature
+dump (SignatureIndex, output/signatures.idx) is searched first
 
 2: get_method_contract(method_id, contract_addr)
 second way is through retrieving contract from etherscan and calculating 
-each hash of the functions, when there is a function implementation then the search
-goes further with the provided proxy contract address. (this only works when 
-this implementation function is public)
+each hash of the functions, when the contract is a proxy then the search
+goes further with the implementation contract address. The implementation
+is read from the EIP-1967/EIP-1822 storage slots or a public implementation
+function (ProxyResolver)
 
 The method_id is the sha256 hash from the string FunctionName(inputtype1,inputtype2,...)
 The method_id is the first 8 characters of the hash with 0x in front (total of 10 chars)
@@ -23,8 +27,11 @@ from web3 import Web3
 import requests
 import config
 from datetime import datetime, timezone
-import json
-from sha3 import keccak_256
+import os
+
+from ProxyResolver import ProxyResolver
+from SignatureIndex import SignatureIndex
+from SignatureStore import ContractSelectorStore, SignatureStore
 
 
 eth_address = Web3.toChecksumAddress(config.ETH_ADDRESS[3])
@@ -33,6 +40,39 @@ eth_address = Web3.toChecksumAddress(config.ETH_ADDRESS[3])
 #eth_address = '0x6975be450864c02b4613023c2152ee0743572325' # NFT
 #eth_address = '0x9dd134d14d1e65f84b706d6f205cd5b1cd03a46b' # mined block
 
+SIGNATURE_DB = os.path.join(config.OUTPUT_PATH, 'signatures.db')
+SIGNATURE_INDEX = os.path.join(config.OUTPUT_PATH, 'signatures.idx')
+_signature_store = None
+_signature_index = None
+_contract_store = None
+_proxy_resolver = None
+
+
+def get_signature_store():
+    """Shared local store of method signatures
+    """
+    global _signature_store
+    if _signature_store is None:
+        _signature_store = SignatureStore(SIGNATURE_DB)
+    return _signature_store
+
+
+def get_contract_store():
+    """Shared local store of the selector tables of contracts
+    """
+    global _contract_store
+    if _contract_store is None:
+        _contract_store = ContractSelectorStore(SIGNATURE_DB)
+    return _contract_store
+
+
+def get_signature_index():
+    """Offline signature index, None when no index is built
+    """
+    global _signature_index
+    if _signature_index is None:
+        _signature_index = SignatureIndex(SIGNATURE_INDEX) if os.path.exists(SIGNATURE_INDEX) else False
+    return _signature_index or None
 
 
 def get_method4byte_dir(method_id):
@@ -45,77 +85,65 @@ def get_method4byte_dir(method_id):
     """
     if len(method_id) != 10:
         return ''
-    
-    url_getmethod = 'https://www.4byte.directory/api/v1/signatures/?hex_signature=' + method_id
-    response_method = requests.request('GET', url_getmethod)
-    resp_method = response_method.json()
-    #print(resp_method)
-    method_function = ''
-    for j in resp_method['results']:
-        method_function += j['text_signature'] + ';'
-    return method_function
+    index = get_signature_index()
+    signatures = index.lookup(method_id) if index is not None else ()
+    if not signatures:
+        signatures = get_signature_store().lookup(method_id)
+    return ''.join(signature + ';' for signature in signatures)
+
+
+def get_proxy_resolver():
+    """Shared resolver of proxy contracts, one provider session for all lookups
+    """
+    global _proxy_resolver
+    if _proxy_resolver is None:
+        _proxy_resolver = ProxyResolver(config.ETH_HTTP_PROVIDER2)
+    return _proxy_resolver
 
 
 def get_contract_implementation(contract_addr):
     """When a contract is a proxy contract, this function gets the implementation contract address
     
-    This is only possible when proxy contract are public
+    The implementation is read from the EIP-1967/EIP-1822 storage slots, or else
+    from a public implementation() function (ProxyResolver)
+    The result, also 'not a proxy', is kept in the local store (ContractSelectorStore)
+    returns '' when the contract is not a proxy
     """
-    web3 = Web3(Web3.HTTPProvider(config.ETH_HTTP_PROVIDER2))
-    if (not web3.isConnected()):
-        print('No ethereum provider, Web3 disconnected')
-        return ''
-    contract = web3.eth.contract(address=Web3.toChecksumAddress(contract_addr.lower()), abi=config.IMPLEMENT_ABI)
-    implementation_address = contract.functions.implementation().call() 
-    print('Using Proxy contract: %s'%(implementation_address))
+    store = get_contract_store()
+    implementation_address = store.get_implementation(contract_addr)
+    if implementation_address is None:
+        try:
+            implementation_address = get_proxy_resolver().resolve(contract_addr)
+        except Exception as e:
+            print('No ethereum provider, proxy not resolved: %s'%(e))
+            return ''
+        store.put_implementation(contract_addr, implementation_address)
+    if implementation_address != '':
+        print('Using Proxy contract: %s'%(implementation_address))
     return implementation_address
 
 
-def get_method_contract(method_id, contract_addr):
+def get_method_contract(method_id, contract_addr, depth=0):
     """Retrieve the contract method function name from etherscan
     
     Reads all functions of a contract,
     When method_id correspond with method_id from one of these functions, return a readable function name
-    When there is a implementation function, also search the implementation contract address for methods
+    When the contract is a proxy, also search the implementation contract address for methods
+    The selector table of each contract is built once from its ABI and kept
+    in the local store (ContractSelectorStore)
     """
     if len(method_id) != 10 or contract_addr == '':
         return ''
     
-    url_getcontractABI = config.ETHERSCAN_URL + \
-                '?module=contract&action=getabi&address=' + \
-                contract_addr + '&apikey=' + \
-                config.ETHERSCAN_API
-    response_method = requests.request('GET', url_getcontractABI)
-    resp_method = response_method.json()
-    resp_method_result = resp_method['result']
-    res = json.loads(resp_method_result)
-    print('-start Contract: %s'%(contract_addr))
-    for i in res:
-        #for k,v in i.items():
-        #    print('%s: %s'%(k,v))
-        if 'inputs' in i and 'name' in i:
-            contr_name = i['name']
-            #contr_inputs = i['inputs']
-            contr_input_types = []
-            for inp in i['inputs']:
-                contr_input_types.append(inp['type'])
-            contr_input_type_str = ','.join(contr_input_types)
-            #print('%s( %s )'%(contr_name, contr_inputs))
-            #print('%s(%s)'%(contr_name, contr_input_type_str))
-            contr_method = '%s(%s)'%(contr_name, contr_input_type_str)
-            sha3_hash = keccak_256(contr_method.encode('utf-8')).hexdigest()
-            contr_method_id = '0x'+sha3_hash[:8]
-            #print('%s %s'%(contr_method_id, contr_method))
-            if contr_method_id == method_id:
-                return contr_method
-            
-            # check for proxy contract implementation
-            if contr_name == 'implementation':
-                contr_proxy = get_contract_implementation(contract_addr)
-                if contr_proxy != '':
-                    return get_method_contract(method_id, contr_proxy)
-        #print()
-    #print('----')
+    table = get_contract_store().lookup(contract_addr)
+    if method_id in table:
+        return table[method_id]
+
+    # check for proxy contract implementation
+    if depth < 3:
+        contr_proxy = get_contract_implementation(contract_addr)
+        if contr_proxy != '' and contr_proxy.lower() != contract_addr.lower():
+            return get_method_contract(method_id, contr_proxy, depth + 1)
     # no method found
     return 'No method found'
 
@@ -131,6 +159,12 @@ def __main__():
     response = requests.request('GET', url_ethtxlist)
     resp = response.json()
     print('number of tx: ', len(resp['result']))
+    # resolve the proxies of all contracts not in the store in one batch
+    store = get_contract_store()
+    contracts = [i['to'] for i in resp['result'] if i['to'] and store.get_implementation(i['to']) is None]
+    if contracts:
+        for contract, implementation in get_proxy_resolver().resolve_many(contracts).items():
+            store.put_implementation(contract, implementation)
     #print(resp)
     for i in resp['result']:
         tx_block = i['blockNumber']
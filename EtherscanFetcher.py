@@ -0,0 +1,171 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Complete account histories from Etherscan, in block windows
+
+Etherscan returns at most 10000 records per query, a query for all blocks
+of a large account is silently truncated. The fetcher starts with one query
+for the whole block range, when the cap is hit the window is cut at the last
+(possibly incomplete) block of the result and the rest of the range is split
+into windows by the record density seen so far. The windows are fetched in
+parallel, paced by the shared rate limiter of RequestHelper.
+The windows do not overlap (a window that hit the cap only keeps its complete
+blocks), the records are stitched in block order without de-duplication:
+equal token transfers in one transaction are separate records.
+
+Endpoints with block windows: txlist, txlistinternal, tokentx, tokennfttx
+getminedblocks has no block range, it is fetched page by page
+
+usage:
+    fetcher = EtherscanFetcher()
+    txs = fetcher.fetch('txlist', address)
+"""
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+from RequestHelper import RequestHelper
+
+# endpoints (actions) of the account module with startblock and endblock
+WINDOW_ACTIONS = ('txlist', 'txlistinternal', 'tokentx', 'tokennfttx')
+
+# message of a status 0 response without records
+NO_RECORDS = ('No transactions found', 'No records found')
+
+
+class EtherscanFetcher():
+    """
+    Fetch account records from Etherscan in block windows
+
+    api_url, api_key = Etherscan (compatible) api
+    req = RequestHelper for the requests, a new one by default
+    workers = maximum number of windows requested at the same time
+    max_records = maximum number of records per query of the api
+    retries = number of retries after an Etherscan NOTOK (rate limit) response
+    """
+
+    def __init__(self, api_url: str = config.ETHERSCAN_URL, api_key: str = config.ETHERSCAN_API,
+                 req: RequestHelper = None, workers: int = 4, max_records: int = 10000,
+                 retries: int = 5):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.req = req or RequestHelper()
+        self.workers = workers
+        self.max_records = max_records
+        self.retries = retries
+
+    def get_result(self, params: dict):
+        """Request the api, returns the result
+
+        A rate limit response is retried, 'No transactions found' is an empty list,
+        any other status 0 response (Invalid API Key, Query Timeout) raises an exception
+        """
+        url = self.req.api_url_params(self.api_url, dict(params, apikey=self.api_key))
+        retry = 0
+        while True:
+            resp = self.req.get_request_response(url)
+            if resp.get('status') != '0':
+                return resp.get('result', [])
+            message = resp.get('message', '')
+            if message.startswith(NO_RECORDS):
+                return []
+            result = resp.get('result')
+            if not (message.startswith('NOTOK') and 'rate limit' in str(result).lower()):
+                raise Exception('Etherscan error: %s, %s' % (message, result))
+            retry += 1
+            if retry > self.retries:
+                raise Exception('Etherscan error: %s' % result)
+            print('Etherscan error: %s, retrying' % result)
+            time.sleep(retry)
+
+    def latest_block(self) -> int:
+        """Current block number of the chain
+        """
+        return int(self.get_result({'module': 'proxy', 'action': 'eth_blockNumber'}), 16)
+
+    def _fetch_window(self, action: str, address: str, start_block: int, end_block: int) -> list:
+        """One query for a block window, ascending
+        """
+        return self.get_result({'module': 'account', 'action': action, 'address': address,
+                                'startblock': start_block, 'endblock': end_block,
+                                'page': 1, 'offset': self.max_records, 'sort': 'asc'})
+
+    def _split(self, start_block: int, end_block: int, density: float) -> list:
+        """Split a block range in windows of about half the record cap,
+        estimated with the density (records per block) of the previous window
+        """
+        blocks = end_block - start_block + 1
+        parts = math.ceil(density * blocks / (self.max_records / 2))
+        parts = max(1, min(parts, blocks, self.workers * 4))
+        size = math.ceil(blocks / parts)
+        return [(first, min(first + size - 1, end_block))
+                for first in range(start_block, end_block + 1, size)]
+
+    def fetch(self, action: str, address: str, start_block: int = 0, end_block: int = None) -> list:
+        """All records of an account endpoint in a block range, in block order
+
+        action = txlist, txlistinternal, tokentx or tokennfttx
+        end_block = last block, the latest block by default
+        """
+        if action not in WINDOW_ACTIONS:
+            raise ValueError('No block windows for action %s' % action)
+        if end_block is None:
+            end_block = self.latest_block()
+
+        windows = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self._fetch_window, action, address, start_block, end_block):
+                       (start_block, end_block)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    first, last = pending.pop(future)
+                    records = future.result()
+                    if len(records) < self.max_records:
+                        windows[first] = records
+                        continue
+
+                    # cap hit: keep the complete blocks, fetch the rest in new windows
+                    last_found = int(records[-1]['blockNumber'])
+                    if last_found == first:
+                        print('Warning: more than %d %s records in block %d, block is incomplete'
+                              % (self.max_records, action, first))
+                        windows[first] = records
+                        next_block = first + 1
+                    else:
+                        windows[first] = [record for record in records
+                                          if int(record['blockNumber']) < last_found]
+                        next_block = last_found
+                    if next_block > last:
+                        continue
+                    density = len(records) / (last_found - first + 1)
+                    for window in self._split(next_block, last, density):
+                        pending[executor.submit(self._fetch_window, action, address, *window)] = window
+
+        return self._stitch(windows)
+
+    def _stitch(self, windows: dict) -> list:
+        """Concatenate the records of the windows in block order
+        """
+        result = []
+        for first in sorted(windows):
+            result.extend(windows[first])
+        return result
+
+    def fetch_mined_blocks(self, address: str, page_size: int = 1000) -> list:
+        """All blocks mined by an address, page by page
+
+        getminedblocks has no block range, so at most max_records blocks
+        """
+        result = []
+        for page in range(1, self.max_records // page_size + 1):
+            records = self.get_result({'module': 'account', 'action': 'getminedblocks',
+                                       'address': address, 'blocktype': 'blocks',
+                                       'page': page, 'offset': page_size})
+            result.extend(records)
+            if len(records) < page_size:
+                break
+        return result
@@ -4,7 +4,7 @@ Created on Feb 20, 2022
 @author: arno
 
 Get all transactions of an eth address with Etherscan.io
- 
+
 1: Normal (Native) ethereum balance
 2: Get a list of ‘Normal’ Transactions By Address
 3: Get a list of ‘Internal’ Transactions by Address
@@ -12,222 +12,224 @@ Get all transactions of an eth address with Etherscan.io
 5: Get a list of “ERC721 — Token Transfer Events” by Address
 6: Get [a] list of Blocks Mined by Address
 
+get_address_txns(addresses) runs the six queries of all addresses
+at the same time on a bounded thread pool, the requests are paced by the
+shared Etherscan rate limiter of RequestHelper.
+The balances are requested with balancemulti, 20 addresses per request.
+With a SyncState the lists are synced incrementally: only the blocks after
+the previous run (minus a reorg safety margin) are requested.
+
+usage:
+    results = get_address_txns([address1, address2])
+    print(results[address1].erc20)
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import os
+
 from web3 import Web3
-import requests
+
 import config
-from datetime import datetime, timezone
-import time
-import sys
+from BalanceService import EtherscanBalanceService, chunks
+from EtherscanContractMethodLookup import get_method4byte_dir
+from EtherscanFetcher import EtherscanFetcher
+from SyncState import SyncDataset, SyncState
+from TxnRecords import (InternalTxn, MinedBlock, NftTransfer, NormalTxn, TokenTransfer,
+                        bytes_to_hex)
+
+# result attribute: Etherscan account action with block windows
+TXN_ENDPOINTS = {
+    'normal': 'txlist',
+    'internal': 'txlistinternal',
+    'erc20': 'tokentx',
+    'erc721': 'tokennfttx',
+}
+
+# result attribute: record type of the result
+TXN_RECORDS = {
+    'normal': NormalTxn,
+    'internal': InternalTxn,
+    'erc20': TokenTransfer,
+    'erc721': NftTransfer,
+    'mined_blocks': MinedBlock,
+}
+
+# datasets of the synced lists
+SYNC_FOLDER = os.path.join(config.OUTPUT_PATH, 'sync')
+
+
+@dataclass
+class AddressTxns:
+    """
+    Results of the Etherscan queries of one address, lists of typed records
+
+    balance = native balance in wei
+    errors = query name: exception, for the queries which failed
+    """
+    address: str
+    balance: int = None
+    normal: list = field(default_factory=list)
+    internal: list = field(default_factory=list)
+    erc20: list = field(default_factory=list)
+    erc721: list = field(default_factory=list)
+    mined_blocks: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
 
 
-eth_address = Web3.toChecksumAddress(config.ETH_ADDRESS[3])
-#eth_address = '0x2c1ba59d6f58433fb1eaee7d20b26ed83bda51a3' # internal tx
-#eth_address = '0x4e83362442b8d1bec281594cea3050c8eb01311c' # token
-#eth_address = '0x6975be450864c02b4613023c2152ee0743572325' # NFT
-#eth_address = '0x9dd134d14d1e65f84b706d6f205cd5b1cd03a46b' # mined block
+def fetch_synced(fetcher: EtherscanFetcher, sync_state: SyncState, chain: str, action: str,
+                 address: str, end_block: int, margin: int) -> list:
+    """Sync the dataset of an address and action up to end_block
 
-def get_request_response(url):
+    returns all records of the dataset
+    """
+    dataset = SyncDataset(sync_state, SYNC_FOLDER, chain, action, address, margin)
+    dataset.append(fetcher.fetch(action, address, dataset.start_block, end_block), end_block)
+    return dataset.read()
+
+
+def get_address_txns(addresses: list, fetcher: EtherscanFetcher = None, workers: int = 8,
+                     start_block: int = 0, end_block: int = None, sync_state: SyncState = None,
+                     margin: int = 12, chain: str = 'eth') -> dict:
+    """Balance and transactions of a list of addresses
+
+    All (address x query) jobs are run on one thread pool, the wall time
+    per address is about the time of the slowest query
+
+    fetcher = EtherscanFetcher, a new one by default
+    workers = maximum number of queries at the same time
+    start_block, end_block = block range of the transactions, default all blocks
+    sync_state = SyncState to sync the lists incrementally (start_block is not used),
+                 the mined blocks have no block range and are always requested
+    margin = number of blocks requested again on the next sync (reorg safety margin)
+    chain = chain of the api, part of the sync state
+    returns dictionary with address: AddressTxns
     """
-    Get a response from an url request
-    Will retry in case of an exception after
+    fetcher = fetcher or EtherscanFetcher()
+    if end_block is None:
+        end_block = fetcher.latest_block()
+
+    results = {address: AddressTxns(address) for address in addresses}
+    balance_service = EtherscanBalanceService(fetcher)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 1: Normal ethereum balances, one request per group of addresses
+        jobs = {}
+        for group in chunks(list(results), balance_service.group_size):
+            jobs[executor.submit(balance_service.get_group_balances, group)] = (group, 'balance')
+        for address in results:
+            for name, action in TXN_ENDPOINTS.items():
+                if sync_state is None:
+                    future = executor.submit(fetcher.fetch, action, address, start_block, end_block)
+                else:
+                    future = executor.submit(fetch_synced, fetcher, sync_state, chain, action,
+                                             address, end_block, margin)
+                jobs[future] = ([address], name)
+            jobs[executor.submit(fetcher.fetch_mined_blocks, address)] = ([address], 'mined_blocks')
+
+        for future in as_completed(jobs):
+            group, name = jobs[future]
+            try:
+                if name == 'balance':
+                    for address, balance in future.result().items():
+                        results[address].balance = balance
+                else:
+                    # parsed once into typed records
+                    record_type = TXN_RECORDS[name]
+                    setattr(results[group[0]], name,
+                            [record_type.from_etherscan(rec) for rec in future.result()])
+            except Exception as e:
+                print('Error %s of %s: %s' % (name, ', '.join(group), e))
+                for address in group:
+                    results[address].errors[name] = e
+    return results
+
+
+def print_normal_txs(res):
+    """2: Print a list of ‘Normal’ Transactions
+    """
+    print('Get a list of "Normal" Transactions By Address')
+    print('number of tx: ', len(res))
+    for tx in res:
+        tx_method_id = tx.method_id
+        # signatures come from the local store, 4byte is only asked for new method ids
+        tx_method = get_method4byte_dir(tx_method_id)
+
+        print('Block: %s %s, From: %s -> To: %s, Contract: %s, value: %s, fee: %s, method: %s, %s'%
+              (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.to_address),
+               bytes_to_hex(tx.contract_address), tx.value / 10**18, tx.fee / 10**18,
+               tx_method_id, tx_method))
+    print()
+
+
+def print_internal_txs(res):
+    """3: Print a list of ‘Internal’ Transactions
+    """
+    print('Get a list of "Internal" Transactions By Address')
+    print('number of tx: ', len(res))
+    for tx in res:
+        # the gas price of an internal transaction is not known, no fee
+        print('Block: %s %s, From: %s -> Contract: %s, value: %s, fee: %s'%
+              (tx.block, tx.time, bytes_to_hex(tx.from_address),
+               bytes_to_hex(tx.contract_address), tx.value / 10**18, 0.0))
+    print()
+
+
+def print_erc20_txs(res):
+    """4: Print a list of “ERC20 — Token Transfer Events”
+    """
+    print('Get a list of "ERC20 — Token Transfer Events" Transactions By Address')
+    print('number of tx: ', len(res))
+    for tx in res:
+        print('Block: %s %s, From: %s -> Contract: %s, to: %s, value: %s %s (%s), fee: %s'%
+              (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.contract_address),
+               bytes_to_hex(tx.to_address), tx.amount, tx.token_symbol, tx.token_name,
+               tx.fee / 10**18))
+    print()
+
+
+def print_erc721_txs(res):
+    """5: Print a list of “ERC721 — Token Transfer Events”
+    """
+    print('Get a list of "ERC721 — Token Transfer Events" Transactions By Address')
+    print('number of tx: ', len(res))
+    for tx in res:
+        print('Block: %s %s, From: %s -> Contract: %s, to: %s, ID: %s %s (%s), fee: %s'%
+              (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.contract_address),
+               bytes_to_hex(tx.to_address), tx.token_id, tx.token_symbol, tx.token_name,
+               tx.fee / 10**18))
+    print()
+
+
+def print_mined_blocks(res):
+    """6: Print a list of Blocks Mined
+    """
+    print('Get a list of Blocks Mined By Address')
+    print('number of tx: ', len(res))
+    for block in res:
+        print('Block: %s %s, reward: %s'%
+              (block.block, block.time, block.reward / 10**18))
+    print()
+
+
+def __main__():
+    """Get and print the balance and all transactions of an address
     """
-    resp = []
-    retries = 1
-    succes = False
-    while not succes:
-        try:
-            response = requests.get(url)
-            resp = response.json()
-            print(resp['status'], resp['message'])
-            if (resp['status']=='0' and resp['message']=='NOTOK'):
-                err_msg = resp['result']
-                raise Exception(err_msg)
-            succes = True
-        except Exception as e:
-            wait = retries*15;
-            print('Error: %s. Waiting %s secs and retrying' % (e, wait))
-            sys.stdout.flush()
-            time.sleep(wait)
-            retries += 1
-    
-    return resp
-
-
-# 1: Normal ethereum balance
-url_eth_balance = config.ETHERSCAN_URL + \
-                '?module=account&action=balance&address=' + \
-                eth_address + '&tag=latest&apikey=' + \
-                config.ETHERSCAN_API 
-resp = get_request_response(url_eth_balance)
-eth_balance = int(resp['result']) / 10**18
-print('Balance: %s ETH'%(eth_balance))
-print()
-
-
-# 2: Get a list of ‘Normal’ Transactions By Address
-# http://api.etherscan.io/api?module=account&action=txlist&address=0xddbd2b932c763ba5b1b7ae3b362eac3e8d40121a&startblock=0&endblock=99999999&sort=asc&apikey=YourApiKeyToken
-print('Get a list of "Normal" Transactions By Address')
-url_eth_txlist =  config.ETHERSCAN_URL + \
-                '?module=account&action=txlist&address=' + \
-                eth_address + '&startblock=0&endblock=latest&sort=asc&apikey=' + \
-                config.ETHERSCAN_API
-resp = get_request_response(url_eth_txlist)
-res = resp['result']
-print('number of tx: ', len(res))
-for i in res:
-    tx_block = i['blockNumber']
-    tx_time = datetime.fromtimestamp(int(i['timeStamp']), tz=timezone.utc)
-    tx_hash = i['hash']
-    tx_nonce = i['nonce']
-    tx_blockhash = i['blockHash']
-    tx_transaction_index = i['transactionIndex']
-    tx_from = i['from']
-    tx_to = i['to']
-    tx_value = int(i['value']) / 10**18
-    tx_gas = int(i['gas'])
-    tx_gas_price = int(i['gasPrice'])
-    tx_gas_used = int(i['gasUsed'])
-    tx_is_error = i['isError']
-    tx_receipt_status = i['txreceipt_status']
-    tx_input = i['input']
-    tx_contract_address = i['contractAddress']
-    tx_cumulative_gas_used = int(i['cumulativeGasUsed'])
-    tx_confirmations = int(i['confirmations'])
-    tx_fee = tx_gas_price * tx_gas_used / 10**18
-    tx_method_id = tx_input[:10]
-    tx_method = ''
-    if len(tx_method_id) == 10:
-        url_getmethod = 'https://www.4byte.directory/api/v1/signatures/?hex_signature=' + tx_method_id
-        response_method = requests.request('GET', url_getmethod)
-        resp_method = response_method.json()
-        #print(resp_method)
-        for j in resp_method['results']:
-            tx_method += j['text_signature'] + ';'
-
-    print('Block: %s %s, From: %s -> To: %s, Contract: %s, value: %s, fee: %s, method: %s, %s'%
-          (tx_block, tx_time, tx_from, tx_to, tx_contract_address, tx_value, tx_fee, tx_method_id, tx_method))
-print()
-
-
-# 3: Get a list of ‘Internal’ Transactions by Address
-# http://api.etherscan.io/api?module=account&action=txlistinternal&address=0x2c1ba59d6f58433fb1eaee7d20b26ed83bda51a3&startblock=0&endblock=2702578&sort=asc&apikey=YourApiKeyToken
-print('Get a list of "Internal" Transactions By Address')
-url_eth_txlist_int =  config.ETHERSCAN_URL + \
-                '?module=account&action=txlistinternal&address=' + \
-                eth_address + '&startblock=0&endblock=latest&sort=asc&apikey=' + \
-                config.ETHERSCAN_API
-resp = get_request_response(url_eth_txlist_int)
-res = resp['result']
-print('number of tx: ', len(res))
-for i in res:
-    tx_block  = i['blockNumber']
-    tx_time = datetime.fromtimestamp(int(i['timeStamp']), tz=timezone.utc)
-    tx_hash = i['hash']
-    tx_from = i['from']
-    tx_to = i['to']
-    tx_value = int(i['value']) / 10**18
-    tx_contract_address = i['contractAddress']
-    tx_input = i['input']
-    tx_type = i['type']
-    tx_gas = int(i['gas'])
-    tx_gas_price = 0 #int(i['gasPrice'])
-    tx_gas_used = int(i['gasUsed'])
-    tx_trace_id = i['traceId']
-    tx_is_error = i['isError']
-    tx_err_code = i['errCode']
-    tx_fee = tx_gas_price * tx_gas_used / 10**18
-    print('Block: %s %s, From: %s -> Contract: %s, value: %s, fee: %s'%
-          (tx_block, tx_time, tx_from, tx_contract_address, tx_value, tx_fee))
-print()
-
-
-# 4: Get a list of “ERC20 — Token Transfer Events” by Address
-# http://api.etherscan.io/api?module=account&action=tokentx&address=0x4e83362442b8d1bec281594cea3050c8eb01311c&startblock=0&endblock=999999999&sort=asc&apikey=YourApiKeyToken
-print('Get a list of "ERC20 — Token Transfer Events" Transactions By Address')
-url_eth_token_txlist =  config.ETHERSCAN_URL + \
-                '?module=account&action=tokentx&address=' + \
-                eth_address + '&startblock=0&endblock=latest&sort=asc&apikey=' + \
-                config.ETHERSCAN_API
-resp = get_request_response(url_eth_token_txlist)
-res = resp['result']
-print('number of tx: ', len(res))
-for i in res:
-    tx_block  = i['blockNumber']
-    tx_time = datetime.fromtimestamp(int(i['timeStamp']), tz=timezone.utc)
-    tx_hash = i['hash']
-    tx_nonce = i['nonce']
-    tx_blockhash = i['blockHash']
-    tx_from = i['from']
-    tx_contract_address = i['contractAddress']
-    tx_to = i['to']
-    tx_token_name = i['tokenName']
-    tx_token_symbol = i['tokenSymbol']
-    tx_token_decimal = int(i['tokenDecimal'])
-    tx_value = int(i['value']) / 10**tx_token_decimal
-    tx_transaction_index = i['transactionIndex']
-    tx_gas = int(i['gas'])
-    tx_gas_price = int(i['gasPrice'])
-    tx_gas_used = int(i['gasUsed'])
-    tx_cumulative_gas_used = int(i['cumulativeGasUsed'])
-    tx_input = i['input']
-    tx_confirmations = int(i['confirmations'])
-    tx_fee = tx_gas_price * tx_gas_used / 10**18
-    print('Block: %s %s, From: %s -> Contract: %s, to: %s, value: %s %s (%s), fee: %s'%
-          (tx_block, tx_time, tx_from, tx_contract_address, tx_to, tx_value, tx_token_symbol, tx_token_name, tx_fee))
-print()
-
-
-# 5: Get a list of “ERC721 — Token Transfer Events” by Address
-# http://api.etherscan.io/api?module=account&action=tokennfttx&address=0x6975be450864c02b4613023c2152ee0743572325&startblock=0&endblock=999999999&sort=asc&apikey=YourApiKeyToken
-print('Get a list of "ERC721 — Token Transfer Events" Transactions By Address')
-url_eth_token_nft_txlist =  config.ETHERSCAN_URL + \
-                '?module=account&action=tokennfttx&address=' + \
-                eth_address + '&startblock=0&endblock=latest&sort=asc&apikey=' + \
-                config.ETHERSCAN_API
-resp = get_request_response(url_eth_token_nft_txlist)
-res = resp['result']
-print('number of tx: ', len(res))
-for i in res:
-    tx_block  = i['blockNumber']
-    tx_time = datetime.fromtimestamp(int(i['timeStamp']), tz=timezone.utc)
-    tx_hash = i['hash']
-    tx_nonce = i['nonce']
-    tx_blockhash = i['blockHash']
-    tx_from = i['from']
-    tx_contract_address = i['contractAddress']
-    tx_to = i['to']
-    tx_token_id = i['tokenID']
-    tx_token_name = i['tokenName']
-    tx_token_symbol = i['tokenSymbol']
-    tx_token_decimal = int(i['tokenDecimal'])
-    tx_transaction_index = i['transactionIndex']
-    tx_gas = int(i['gas'])
-    tx_gas_price = int(i['gasPrice'])
-    tx_gas_used = int(i['gasUsed'])
-    tx_cumulative_gas_used = int(i['cumulativeGasUsed'])
-    tx_input = i['input']
-    tx_confirmations = int(i['confirmations'])
-    tx_fee = tx_gas_price * tx_gas_used / 10**18
-    print('Block: %s %s, From: %s -> Contract: %s, to: %s, ID: %s %s (%s), fee: %s'%
-          (tx_block, tx_time, tx_from, tx_contract_address, tx_to, tx_token_id, tx_token_symbol, tx_token_name, tx_fee))
-print()
-
-
-# 6: Get [a] list of Blocks Mined by Address
-# https://api.etherscan.io/api?module=account&action=getminedblocks&address=0x9dd134d14d1e65f84b706d6f205cd5b1cd03a46b&blocktype=blocks&apikey=YourApiKeyToken
-print('Get a list of Blocks Mined By Address')
-url_eth_mined_blocklist =  config.ETHERSCAN_URL + \
-                '?module=account&action=getminedblocks&address=' + \
-                eth_address + '&startblock=0&endblock=latest&sort=asc&apikey=' + \
-                config.ETHERSCAN_API
-resp = get_request_response(url_eth_mined_blocklist)
-res = resp['result']
-print('number of tx: ', len(res))
-for i in res:
-    tx_block  = i['blockNumber']
-    tx_time = datetime.fromtimestamp(int(i['timeStamp']), tz=timezone.utc)
-    tx_block_reward  = int(i['blockReward']) / 10**18
-    print('Block: %s %s, reward: %s'%
-          (tx_block, tx_time, tx_block_reward))
-print()
+    eth_address = Web3.toChecksumAddress(config.ETH_ADDRESS[3])
+    #eth_address = '0x2c1ba59d6f58433fb1eaee7d20b26ed83bda51a3' # internal tx
+    #eth_address = '0x4e83362442b8d1bec281594cea3050c8eb01311c' # token
+    #eth_address = '0x6975be450864c02b4613023c2152ee0743572325' # NFT
+    #eth_address = '0x9dd134d14d1e65f84b706d6f205cd5b1cd03a46b' # mined block
+
+    sync_state = SyncState(os.path.join(config.OUTPUT_PATH, 'sync.db'))
+    result = get_address_txns([eth_address], sync_state=sync_state)[eth_address]
+    if result.balance is not None:
+        print('Balance: %s ETH'%(result.balance / 10**18))
+        print()
+    print_normal_txs(result.normal)
+    print_internal_txs(result.internal)
+    print_erc20_txs(result.erc20)
+    print_erc721_txs(result.erc721)
+    print_mined_blocks(result.mined_blocks)
+
+
+if __name__ == '__main__':
+    __main__()
@@ -0,0 +1,188 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Prefilter blocks with the logsBloom of the block header
+
+The logsBloom is a 2048 bit bloom filter of all log addresses and log topics
+in a block. For each item 3 bits are set, taken from the keccak hash of the item.
+When one of these bits is not set, the item is certainly not in the logs of the block.
+
+A tracked address is searched as log address (token contract) and
+as topic (indexed address of a Transfer event, padded to 32 bytes).
+With token contracts, a topic only matches in logs of these contracts.
+The logs of the blocks which might match are fetched (eth_getLogs) and
+matched on the same criteria, so the transactions of token transfers
+to or from an address are found, also when the address is not the
+sender or receiver of the transaction.
+Note: plain ether transfers do not create logs, these are not in the bloom
+"""
+import threading
+
+from sha3 import keccak_256
+
+from AddressMatcher import address_to_bytes
+from W3BatchRequest import quantity_to_int
+
+
+def bloom_mask(item: bytes) -> int:
+    """Bits of an item in the bloom filter as a 2048 bit integer
+    """
+    item_hash = keccak_256(item).digest()
+    mask = 0
+    for i in (0, 2, 4):
+        mask |= 1 << (((item_hash[i] << 8) | item_hash[i + 1]) & 2047)
+    return mask
+
+
+def bloom_to_int(bloom) -> int:
+    """Convert a logsBloom (hex string or bytes) to an integer
+    """
+    if isinstance(bloom, str):
+        return int(bloom, 16)
+    return int.from_bytes(bloom, 'big')
+
+
+class BloomFilter():
+    """
+    Test a logsBloom and logs for a set of addresses and token contracts
+
+    addresses = addresses, searched as log address and as log topic
+    contracts = token contract addresses, a topic only matches in logs of these contracts
+    """
+
+    def __init__(self, addresses: list, contracts: list = None):
+        self.addresses = frozenset(address_to_bytes(addr) for addr in addresses)
+        self.contracts = frozenset(address_to_bytes(addr) for addr in contracts or [])
+        self.address_masks = [bloom_mask(addr) for addr in self.addresses]
+        self.topic_masks = [bloom_mask(addr.rjust(32, b'\0')) for addr in self.addresses]
+        self.contract_masks = [bloom_mask(addr) for addr in self.contracts]
+
+    @staticmethod
+    def _any(bloom: int, masks: list) -> bool:
+        for mask in masks:
+            if bloom & mask == mask:
+                return True
+        return False
+
+    def might_match(self, bloom) -> bool:
+        """Test the logsBloom of a block
+
+        returns False when none of the logs of the block can match
+        """
+        bloom = bloom_to_int(bloom)
+        if self._any(bloom, self.address_masks):
+            return True
+        return self._any(bloom, self.topic_masks) and \
+            (not self.contracts or self._any(bloom, self.contract_masks))
+
+    def match_log(self, log: dict) -> list:
+        """Get the tracked addresses of a log
+
+        log = log with 'address' and 'topics' keys (JSON-RPC)
+        returns list of matching addresses as bytes, empty when nothing matches
+        """
+        matches = []
+        log_address = address_to_bytes(log['address'])
+        if log_address in self.addresses:
+            matches.append(log_address)
+        if not self.contracts or log_address in self.contracts:
+            for topic in log['topics'][1:]:
+                topic = address_to_bytes(topic)
+                if topic[:12] == bytes(12) and topic[12:] in self.addresses and \
+                        topic[12:] not in matches:
+                    matches.append(topic[12:])
+        return matches
+
+
+class BloomFilteredSource():
+    """
+    Block source which first fetches the headers of a range of blocks,
+    and only fetches the full blocks of which the logsBloom might match
+
+    Skipped blocks are returned as header without transactions.
+    The logs of the fetched blocks are matched with the bloom filter, the
+    matching logs are added to the block as 'matched_logs':
+    dict transaction hash -> list of logs
+
+    source = block source with get_blocks and get_blocks_by_number functions
+    bloom_filter = BloomFilter with the addresses and contracts
+    log_source = source with a get_logs function, default source
+    """
+
+    def __init__(self, source, bloom_filter: BloomFilter, log_source=None):
+        self.source = source
+        self.bloom_filter = bloom_filter
+        self.log_source = log_source or source
+        self.lock = threading.Lock()
+        self.blocks_checked = 0
+        self.blocks_downloaded = 0
+        self.blocks_matched = 0
+        self.bytes_skipped = 0
+
+    def get_blocks(self, start_block: int, end_block: int, full_transactions=True) -> list:
+        """Get all blocks in the range [start_block, end_block)
+        """
+        headers = self.source.get_blocks(start_block, end_block, full_transactions=False)
+        if not full_transactions:
+            return headers
+
+        blocks = []
+        numbers = []
+        bytes_skipped = 0
+        for idx, header in enumerate(headers):
+            if self.bloom_filter.might_match(header['logsBloom']):
+                numbers.append(start_block + idx)
+                blocks.append(None)
+            else:
+                bytes_skipped += quantity_to_int(header['size'])
+                blocks.append(dict(header, transactions=[]))
+
+        full_blocks = self.source.get_blocks_by_number(numbers, full_transactions=True)
+        block_logs = self.log_source.get_logs([block['hash'] for block in full_blocks])
+        full_blocks = iter([dict(block, matched_logs=self.match_logs(logs))
+                            for block, logs in zip(full_blocks, block_logs)])
+        blocks = [block if block is not None else next(full_blocks) for block in blocks]
+
+        with self.lock:
+            self.blocks_checked += len(headers)
+            self.blocks_downloaded += len(numbers)
+            self.bytes_skipped += bytes_skipped
+        return blocks
+
+    def match_logs(self, logs: list) -> dict:
+        """Logs matching the bloom filter per transaction hash
+        """
+        matched = {}
+        for log in logs:
+            if self.bloom_filter.match_log(log):
+                matched.setdefault(log['transactionHash'], []).append(log)
+        return matched
+
+    def match_tx_logs(self, logs: list) -> list:
+        """Tracked addresses of the matched logs of a transaction
+        """
+        matches = []
+        for log in logs:
+            for address in self.bloom_filter.match_log(log):
+                if address not in matches:
+                    matches.append(address)
+        return matches
+
+    def add_matched_block(self):
+        """Count a downloaded block with a matching transaction or log
+        """
+        with self.lock:
+            self.blocks_matched += 1
+
+    def summary(self) -> str:
+        """Summary of the prefilter for the end of a run
+        """
+        false_positives = self.blocks_downloaded - self.blocks_matched
+        rate = 100 * false_positives / self.blocks_downloaded if self.blocks_downloaded else 0
+        return ('Bloom filter: %d blocks checked, %d downloaded in full, '
+                '%d without a matching transaction or log (%.1f%% false positive), '
+                '%d bytes of skipped blocks not downloaded' %
+                (self.blocks_checked, self.blocks_downloaded, false_positives, rate,
+                 self.bytes_skipped))
@@ -12,13 +12,24 @@ Get all transactions of an address with Moralis
 5: Get a list of “ERC721 — Token Transfer Events” by Address
 6: Not done, Get [a] list of Blocks Mined by Address
 
+The lists are synced incrementally, only blocks after the previous run
+(minus a reorg safety margin) are requested and appended to the dataset
+
 """
 from web3 import Web3
-from datetime import datetime, timezone
+import os
 import requests
 import sys
 import config
 
+from EtherscanContractMethodLookup import get_method4byte_dir
+from SyncState import SyncDataset, SyncState
+from TxnRecords import NftTransfer, NormalTxn, TokenTransfer, bytes_to_hex
+
+# datasets of the synced lists, blocks requested again on each run
+SYNC_FOLDER = os.path.join(config.OUTPUT_PATH, 'sync')
+SYNC_MARGIN = 12
+
 # check configuration
 if (config.MORALIS_NODE_KEY=='' or config.MORALIS_API_DEF==''):
     sys.exit('No Moralis node key or API defined in config file. Aborting')
@@ -41,50 +52,50 @@ header = {
   'x-api-key': config.MORALIS_API_DEF
 }
 
+sync_state = SyncState(os.path.join(config.OUTPUT_PATH, 'sync.db'))
+end_block = w3.eth.blockNumber
+
+
+def sync_list(url, endpoint):
+    """Request the records after the previous run and append them to the dataset
+
+    An incomplete response (more records than one page) is not committed,
+    so the next run requests these blocks again
+    returns all records of the dataset
+    """
+    dataset = SyncDataset(sync_state, SYNC_FOLDER, chain, endpoint, eth_address,
+                          SYNC_MARGIN, 'block_number')
+    url += '&from_block=%s&to_block=%s' % (dataset.start_block, end_block)
+    response = requests.get(url, headers=header)
+    resp = response.json()
+    tx_total = resp['total']
+    tx_page = resp['page']
+    tx_page_size = resp['page_size']
+    print('Total tx %s, page %s, pagesize %s'%(tx_total,tx_page,tx_page_size))
+    if tx_total > len(resp['result']):
+        print('Incomplete list, sync state not updated')
+        old = [tx for tx in dataset.read() if int(tx['block_number']) < dataset.start_block]
+        return old + resp['result'][::-1]
+    # moralis returns the newest records first
+    dataset.append(sorted(resp['result'], key=lambda tx: int(tx['block_number'])), end_block)
+    return dataset.read()
+
+
 # 2: Get a list of ‘Normal’ Transactions By Address
 # https://deep-index.moralis.io/api/v2/0x4e83362442b8d1bec281594cea3050c8eb01311c?chain=eth
 print('Get a list of "Normal" Transactions By Address')
 url_eth_txlist = 'https://deep-index.moralis.io/api/v2/'+ eth_address + '?chain=' + chain + '&page=1'
-response = requests.get(url_eth_txlist, headers=header)
-resp = response.json()
-tx_total = resp['total']
-tx_page = resp['page']
-tx_page_size = resp['page_size']
-print('Total tx %s, page %s, pagesize %s'%(tx_total,tx_page,tx_page_size))
-print('number of tx: ', len(resp['result']))
-for i in resp['result']:
-    tx_hash = i['hash']
-    tx_nonce = i['nonce']
-    tx_txns_index = i['transaction_index']
-    tx_from = i['from_address']
-    tx_to = i['to_address']
-    tx_value = int(i['value']) / 10**18
-    tx_gas = int(i['gas'])
-    tx_gas_price = int(i['gas_price'])
-    tx_time = datetime.fromisoformat(i['block_timestamp'][:-1]).astimezone(timezone.utc)
-    tx_block  = i['block_number']
-    tx_block_hash = i['block_hash']
-    tx_cumulative_gas_used = int(i['receipt_cumulative_gas_used'])
-    tx_gas_used = int(i['receipt_gas_used'])
-    tx_contract_address = i['receipt_contract_address']
-    tx_input = i['input']
-    tx_receipt_status = i['receipt_status']
-    tx_receipt_root = i['receipt_root']
-   
-    tx_fee = tx_gas_price * tx_gas_used / 10**18
-    tx_method_id = tx_input[:10]
-    tx_method = ''
-    # temporalely disabled because of speed
-    # if len(tx_method_id) == 10:
-    #     urlGetMethod = 'https://www.4byte.directory/api/v1/signatures/?hex_signature=' + tx_method_id
-    #     responseMethod = requests.request('GET', urlGetMethod)
-    #     respMethod = responseMethod.json()
-    #     #print(respMethod)
-    #     for j in respMethod['results']:
-    #         tx_method += j['text_signature'] + ';'
+res = [NormalTxn.from_moralis(rec) for rec in sync_list(url_eth_txlist, 'transactions')]
+print('number of tx: ', len(res))
+for tx in res:
+    tx_method_id = tx.method_id
+    # signatures come from the local store, 4byte is only asked for new method ids
+    tx_method = get_method4byte_dir(tx_method_id)
 
     print('Block: %s %s, From: %s -> To: %s, Contract: %s, value: %s, fee: %s, method: %s, %s'%
-          (tx_block, tx_time, tx_from, tx_to, tx_contract_address, tx_value, tx_fee, tx_method_id, tx_method))
+          (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.to_address),
+           bytes_to_hex(tx.contract_address), tx.value / 10**18, tx.fee / 10**18,
+           tx_method_id, tx_method))
 print()
 
 
@@ -92,24 +103,12 @@ print()
 # https://deep-index.moralis.io/api/v2/0x4e83362442b8d1bec281594cea3050c8eb01311c/erc20/transfers?chain=eth
 print('Get a list of "ERC20 — Token Transfer Events" Transactions By Address')
 url_eth_token_txlist = 'https://deep-index.moralis.io/api/v2/'+ eth_address + '/erc20/transfers?chain=' + chain
-response = requests.get(url_eth_token_txlist, headers=header)
-resp = response.json()
-tx_total = resp['total']
-tx_page = resp['page']
-tx_page_size = resp['page_size']
-print('Total tx %s, page %s, pagesize %s'%(tx_total,tx_page,tx_page_size))
-print('number of tx: ', len(resp['result']))
-for i in resp['result']:
-    tx_hash = i['transaction_hash']
-    tx_contract_address = i['address']
-    tx_time = datetime.fromisoformat(i['block_timestamp'][:-1]).astimezone(timezone.utc)
-    tx_block  = i['block_number']
-    tx_block_hash = i['block_hash']
-    tx_from = i['from_address']
-    tx_to = i['to_address']
-    tx_value = int(i['value'])
+res = [TokenTransfer.from_moralis(rec) for rec in sync_list(url_eth_token_txlist, 'erc20_transfers')]
+print('number of tx: ', len(res))
+for tx in res:
     print('Block: %s %s, From: %s -> Contract: %s, to: %s, value: %s'%
-          (tx_block, tx_time, tx_from, tx_contract_address, tx_to, tx_value))
+          (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.contract_address),
+           bytes_to_hex(tx.to_address), tx.value))
 print()
 
 
@@ -117,31 +116,10 @@ print()
 # https://deep-index.moralis.io/api/v2/0x4e83362442b8d1bec281594cea3050c8eb01311c/nft/transfers?chain=eth
 print('Get a list of "ERC721 — Token Transfer Events" Transactions By Address')
 url_eth_token_nft_txlist = 'https://deep-index.moralis.io/api/v2/'+ eth_address + '/nft/transfers?chain=' + chain
-response = requests.get(url_eth_token_nft_txlist, headers=header)
-resp = response.json()
-tx_total = resp['total']
-tx_page = resp['page']
-tx_page_size = resp['page_size']
-print('Total tx %s, page %s, pagesize %s'%(tx_total,tx_page,tx_page_size))
-print('number of tx: ', len(resp['result']))
-for i in resp['result']:
-    tx_block  = i['block_number']
-    tx_time = datetime.fromisoformat(i['block_timestamp'][:-1]).astimezone(timezone.utc)
-    tx_hash = i['transaction_hash']
-    tx_type = i['transaction_type']
-    tx_transaction_index = i['transaction_index']
-    tx_block_hash = i['block_hash']
-    tx_from = i['from_address']
-    tx_contract_address = i['token_address']
-    tx_to = i['to_address']
-    tx_tokenID = i['token_id']
-    tx_value = int(i['value']) / 10**18
-    tx_amount = int(i['amount'])
-    tx_contract_type = i['contract_type']
-    tx_log_index = i['log_index']
-    tx_verified = i['verified']
-    tx_operator = i['operator']
+res = [NftTransfer.from_moralis(rec) for rec in sync_list(url_eth_token_nft_txlist, 'nft_transfers')]
+print('number of tx: ', len(res))
+for tx in res:
     print('Block: %s %s, From: %s -> Contract: %s, to: %s, ID: %s'%
-          (tx_block, tx_time, tx_from, tx_contract_address, tx_to, tx_tokenID))
+          (tx.block, tx.time, bytes_to_hex(tx.from_address), bytes_to_hex(tx.contract_address),
+           bytes_to_hex(tx.to_address), tx.token_id))
 print()
-
@@ -0,0 +1,239 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Portfolio analytics over whole transaction sets of an address
+
+Reports with columnar pandas/NumPy operations instead of per row loops:
+1: total_fees, fees paid by the address
+2: token_net_flows, inflow, outflow and net flow per token contract
+3: counterparty_volumes, received and sent value per counterparty
+4: daily_series, daily inflow, outflow, net flow and fees
+
+Values are 256 bit integers, which do not fit in a NumPy column.
+A value is split in 32 bit limbs, one uint64 column per limb, so sums of
+the limbs can not overflow for less than 2**32 rows. After the (group) sums
+the limbs are combined into exact Python integers.
+
+The input are the typed records of TxnRecords (Etherscan or Moralis).
+
+usage:
+    fees = total_fees(result.normal, address)
+    flows = token_net_flows(result.erc20, address)
+    frame = TxnFrame(result.normal, address)
+    volumes, days = counterparty_volumes(frame, address), daily_series(frame, address)
+"""
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+from TxnRecords import TxnColumns, bytes_to_hex, hex_to_bytes
+
+LIMB_BITS = 32
+
+
+def value_limbs(values: list) -> np.ndarray:
+    """Split integers (up to 256 bits) in 32 bit limbs
+
+    The number of limbs is the number needed for the largest value
+    returns uint64 array with shape (rows, limbs), least significant limb first
+    """
+    if not values:
+        return np.zeros((0, 1), dtype=np.uint64)
+    nbytes = max(4, -(-max(values).bit_length() // 32) * 4)
+    data = b''.join([value.to_bytes(nbytes, 'little') for value in values])
+    return np.frombuffer(data, dtype='<u4').reshape(len(values), -1).astype(np.uint64)
+
+
+def product_limbs(factor1: np.ndarray, factor2: np.ndarray) -> np.ndarray:
+    """Exact products of uint64 columns, in 32 bit limbs
+
+    factor1 = uint64 column (gas price)
+    factor2 = uint64 column below 2**32 (gas used)
+    returns uint64 array with shape (rows, 3), each limb below 2**32
+    """
+    mask = np.uint64(2**LIMB_BITS - 1)
+    shift = np.uint64(LIMB_BITS)
+    low = (factor1 & mask) * factor2
+    high = (factor1 >> shift) * factor2
+    # the middle sum can reach 2**33, its carry goes to the high limb,
+    # so every limb is below 2**32 (the product is below 2**96)
+    middle = (low >> shift) + (high & mask)
+    return np.stack([low & mask, middle & mask, (high >> shift) + (middle >> shift)], axis=1)
+
+
+def limbs_to_ints(limbs: np.ndarray) -> np.ndarray:
+    """Combine (summed) limbs to exact Python integers
+
+    limbs = array with shape (rows, limbs)
+    returns object array of Python ints
+    """
+    result = np.zeros(len(limbs), dtype=object)
+    for idx in range(limbs.shape[1]):
+        result += limbs[:, idx].astype(object) << (LIMB_BITS * idx)
+    return result
+
+
+def check_rows(limbs: np.ndarray):
+    """Sums of 32 bit limbs in uint64 are exact for less than 2**32 rows
+    """
+    if len(limbs) >= 2**32:
+        raise ValueError('%d rows, limb sums would overflow' % len(limbs))
+
+
+def limbs_sum(limbs: np.ndarray) -> int:
+    """Exact sum of a column of limbs
+    """
+    check_rows(limbs)
+    return int(limbs_to_ints(limbs.sum(axis=0, keepdims=True))[0])
+
+
+def group_sums(codes: np.ndarray, limbs: np.ndarray, groups: int) -> np.ndarray:
+    """Exact sums of limbs per group
+
+    codes = group number of each row
+    returns object array of Python ints, one per group
+    """
+    check_rows(limbs)
+    sums = pd.DataFrame(limbs).groupby(codes).sum()
+    sums = sums.reindex(range(groups), fill_value=0)
+    return limbs_to_ints(sums.to_numpy(dtype=np.uint64))
+
+
+def address_bytes(owner) -> bytes:
+    """Address as 20 bytes, from hex string or bytes
+    """
+    return hex_to_bytes(owner) if isinstance(owner, str) else owner
+
+
+class TxnFrame():
+    """
+    Columns of a transaction set relative to an owner address
+
+    The columns are extracted from the records once, a TxnFrame can be
+    given to the reports instead of the records to make several reports
+
+    records = typed records (Txn subclasses) of one type
+    owner = address of the portfolio
+    """
+
+    def __init__(self, records: list, owner):
+        self.records = records
+        owner = np.frombuffer(address_bytes(owner), dtype='S20')[0]
+        fields = ['block', 'timestamp', 'from_address', 'to_address']
+        if records and hasattr(records[0], 'contract_address'):
+            fields.append('contract_address')
+        if records and hasattr(records[0], 'gas_price'):
+            fields += ['gas_price', 'gas_used']
+        columns = TxnColumns(records, fields).columns
+
+        self.length = len(records)
+        self.timestamp = np.frombuffer(columns['timestamp'], dtype=np.uint64)
+        self.from_address = np.frombuffer(columns['from_address'], dtype='S20')
+        self.to_address = np.frombuffer(columns['to_address'], dtype='S20')
+        self.contract = (np.frombuffer(columns['contract_address'], dtype='S20')
+                         if 'contract_address' in columns else None)
+        self.incoming = (self.to_address == owner) & (self.from_address != owner)
+        self.outgoing = (self.from_address == owner) & (self.to_address != owner)
+        self.values = value_limbs(list(map(attrgetter('value'), records)))
+        if 'gas_price' in columns:
+            gas_price = np.frombuffer(columns['gas_price'], dtype=np.uint64)
+            gas_used = np.frombuffer(columns['gas_used'], dtype=np.uint64)
+            # only the sender pays the fee
+            self.fees = product_limbs(gas_price, gas_used) * (self.from_address == owner)[:, None]
+        else:
+            self.fees = np.zeros((self.length, 1), dtype=np.uint64)
+
+    def inflow(self) -> np.ndarray:
+        return self.values * self.incoming[:, None]
+
+    def outflow(self) -> np.ndarray:
+        return self.values * self.outgoing[:, None]
+
+    def counterparty(self) -> np.ndarray:
+        """Other address of each transaction
+        """
+        return np.where(self.incoming, self.from_address, self.to_address)
+
+
+def get_frame(records, owner) -> TxnFrame:
+    """TxnFrame of records, a TxnFrame is used as it is
+    """
+    return records if isinstance(records, TxnFrame) else TxnFrame(records, owner)
+
+
+def _hex_addresses(addresses: np.ndarray) -> list:
+    """S20 values (trailing zeros are stripped by NumPy) to hex strings
+    """
+    return [bytes_to_hex(address.ljust(20, b'\0')) for address in addresses]
+
+
+def total_fees(records: list, owner) -> int:
+    """1: Total fees in wei paid by the owner
+    """
+    return limbs_sum(get_frame(records, owner).fees)
+
+
+def token_net_flows(transfers: list, owner) -> pd.DataFrame:
+    """2: Inflow, outflow and net flow per token contract
+
+    transfers = TokenTransfer records (or their TxnFrame)
+    returns DataFrame indexed by contract with exact integer flows (object columns)
+    and net_amount (float, in tokens)
+    """
+    frame = get_frame(transfers, owner)
+    if frame.length == 0:
+        # no records, no contract column
+        return pd.DataFrame(columns=['symbol', 'decimals', 'transfers', 'inflow', 'outflow',
+                                     'net', 'net_amount'],
+                            index=pd.Index([], name='contract'))
+    transfers = frame.records
+    contracts, codes = np.unique(frame.contract, return_inverse=True)
+    inflow = group_sums(codes, frame.inflow(), len(contracts))
+    outflow = group_sums(codes, frame.outflow(), len(contracts))
+
+    # symbol and decimals of the first transfer of each contract
+    _, first = np.unique(codes, return_index=True)
+    symbols = [transfers[idx].token_symbol for idx in first]
+    decimals = [transfers[idx].token_decimal for idx in first]
+    result = pd.DataFrame({'symbol': symbols, 'decimals': decimals,
+                           'transfers': np.bincount(codes, minlength=len(contracts)),
+                           'inflow': inflow, 'outflow': outflow, 'net': inflow - outflow},
+                          index=pd.Index(_hex_addresses(contracts), name='contract'))
+    result['net_amount'] = [float(net) / 10**(decimal or 0)
+                            for net, decimal in zip(result['net'], result['decimals'])]
+    return result
+
+
+def counterparty_volumes(records: list, owner) -> pd.DataFrame:
+    """3: Received and sent value per counterparty
+
+    records = Txn records of one type (value in wei or token units), or their TxnFrame
+    returns DataFrame indexed by counterparty, sorted by volume
+    """
+    frame = get_frame(records, owner)
+    counterparties, codes = np.unique(frame.counterparty(), return_inverse=True)
+    received = group_sums(codes, frame.inflow(), len(counterparties))
+    sent = group_sums(codes, frame.outflow(), len(counterparties))
+    result = pd.DataFrame({'transactions': np.bincount(codes, minlength=len(counterparties)),
+                           'received': received, 'sent': sent, 'volume': received + sent},
+                          index=pd.Index(_hex_addresses(counterparties), name='counterparty'))
+    return result.sort_values('volume', ascending=False, key=lambda col: col.map(float))
+
+
+def daily_series(records: list, owner) -> pd.DataFrame:
+    """4: Daily number of transactions, inflow, outflow, net flow and fees (UTC days)
+
+    returns DataFrame indexed by date, days without transactions are not included
+    """
+    frame = get_frame(records, owner)
+    days, codes = np.unique(frame.timestamp // np.uint64(86400), return_inverse=True)
+    inflow = group_sums(codes, frame.inflow(), len(days))
+    outflow = group_sums(codes, frame.outflow(), len(days))
+    return pd.DataFrame({'transactions': np.bincount(codes, minlength=len(days)),
+                         'inflow': inflow, 'outflow': outflow, 'net': inflow - outflow,
+                         'fees': group_sums(codes, frame.fees, len(days))},
+                        index=pd.Index(pd.to_datetime(days.astype(np.int64) * 86400, unit='s',
+                                                      utc=True), name='date'))
@@ -0,0 +1,151 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Resolve the implementation contract of proxy contracts
+
+The implementation address is read from the standard storage slots with
+eth_getStorageAt, this also works when the proxy has no public
+implementation() function:
+- EIP-1967 implementation slot
+- EIP-1967 beacon slot, the implementation is implementation() of the beacon
+- EIP-1822 (UUPS) PROXIABLE slot
+When no slot is set, implementation() of the contract is called.
+
+The reads of many proxies are sent in one JSON-RPC batch (BatchRpcClient)
+over one shared session. The results are cached per proxy with the block
+of the read, a result is used for ttl_blocks blocks (an upgrade changes
+the implementation).
+
+usage:
+    resolver = ProxyResolver(config.ETH_HTTP_PROVIDER)
+    implementations = resolver.resolve_many(['0x...', '0x...'])
+    implementation = resolver.resolve('0x...')   # '' when not a proxy
+"""
+import threading
+import time
+
+from W3BatchRequest import BatchRpcClient, quantity_to_int
+
+# keccak('eip1967.proxy.implementation') - 1
+IMPLEMENTATION_SLOT = '0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc'
+# keccak('eip1967.proxy.beacon') - 1
+BEACON_SLOT = '0xa3f0ad74e5423aebfd80d3ef4346578335a9a72aeaee59ff6cb3582b35133d50'
+# keccak('PROXIABLE')
+PROXIABLE_SLOT = '0xc5f16f0fcc639fa48a6947836d9850f504798523bf8c9a3a87d5876cf622bcf7'
+SLOTS = (IMPLEMENTATION_SLOT, BEACON_SLOT, PROXIABLE_SLOT)
+# selector of implementation()
+IMPLEMENTATION_CALL = '0x5c60da1b'
+
+
+def word_to_address(word) -> str:
+    """Address in the last 20 bytes of a 32 byte word, '' for zero, empty or an error
+    """
+    if not isinstance(word, str) or len(word) < 42:
+        return ''
+    address = '0x' + word[-40:].lower()
+    return '' if int(address, 16) == 0 else address
+
+
+class ProxyResolver():
+    """
+    Proxy to implementation resolver with a block aware cache
+
+    endpoint = url of the http provider, a W3ProviderPool or a BatchRpcClient
+    ttl_blocks = number of blocks a resolved implementation is used
+    block_interval = seconds the latest block number is used without asking the provider
+    """
+
+    def __init__(self, endpoint, ttl_blocks: int = 7200, block_interval: float = 12,
+                 batch_size: int = 100):
+        if isinstance(endpoint, BatchRpcClient):
+            self.client = endpoint
+        else:
+            self.client = BatchRpcClient(endpoint, batch_size)
+        self.ttl_blocks = ttl_blocks
+        self.block_interval = block_interval
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.latest = (None, 0)
+
+    def latest_block(self) -> int:
+        """Latest block number, asked at most once per block_interval
+        """
+        block, checked = self.latest
+        if block is None or time.monotonic() - checked > self.block_interval:
+            block = quantity_to_int(self.client.request([('eth_blockNumber', [])])[0])
+            self.latest = (block, time.monotonic())
+        return block
+
+    def _cached(self, address: str, block: int):
+        """Cached implementation at a block, None when not cached or expired
+        """
+        entry = self.cache.get(address)
+        if entry is None or not 0 <= block - entry[1] < self.ttl_blocks:
+            return None
+        return entry[0]
+
+    def _call_implementation(self, addresses: list, block_tag: str) -> list:
+        """implementation() of contracts in one batch, '' when the call fails
+        """
+        results = self.client.request([('eth_call', [{'to': address, 'data': IMPLEMENTATION_CALL},
+                                                     block_tag]) for address in addresses],
+                                      raise_errors=False)
+        return [word_to_address(result) for result in results]
+
+    def resolve_many(self, addresses: list, block: int = None) -> dict:
+        """Implementations of contracts
+
+        addresses = contract addresses
+        block = block number of the reads, default the latest block
+        returns dict address (lower case) -> implementation address, '' when not a proxy
+        """
+        if block is None:
+            block = self.latest_block()
+        block_tag = hex(block)
+        result = {}
+        missing = []
+        with self.lock:
+            for address in dict.fromkeys(address.lower() for address in addresses):
+                implementation = self._cached(address, block)
+                if implementation is None:
+                    missing.append(address)
+                else:
+                    result[address] = implementation
+        if not missing:
+            return result
+
+        # 1: storage slots of all proxies in one batch
+        words = self.client.request([('eth_getStorageAt', [address, slot, block_tag])
+                                     for address in missing for slot in SLOTS])
+        resolved = {}
+        beacons = {}
+        for idx, address in enumerate(missing):
+            implementation, beacon, proxiable = (word_to_address(word)
+                                                 for word in words[3 * idx:3 * idx + 3])
+            if implementation or proxiable:
+                resolved[address] = implementation or proxiable
+            elif beacon:
+                beacons[address] = beacon
+
+        # 2: implementation() of the beacons
+        if beacons:
+            implementations = self._call_implementation(list(beacons.values()), block_tag)
+            resolved.update(zip(beacons, implementations))
+
+        # 3: implementation() of the contracts without slots
+        others = [address for address in missing if address not in resolved]
+        if others:
+            resolved.update(zip(others, self._call_implementation(others, block_tag)))
+
+        with self.lock:
+            for address, implementation in resolved.items():
+                self.cache[address] = (implementation, block)
+        result.update(resolved)
+        return result
+
+    def resolve(self, address: str, block: int = None) -> str:
+        """Implementation of a contract, '' when not a proxy
+        """
+        return self.resolve_many([address], block)[address.lower()]
@@ -4,22 +4,292 @@ Created on Apr 21, 2022
 @author: arno
 
 Request URL Helper to get response from API 
+
+Requests are paced per host by a token bucket, shared by all threads and
+async tasks, so the known rate limits of an API are not exceeded.
+The Retry-After of a 429 response pauses the bucket of that host.
+
+Identical GET requests in flight at the same moment are coalesced:
+one request is sent, the other threads wait and share its response.
+
+Large responses can be parsed while they are downloaded with
+iter_request_results, which yields the records of the result array.
+
+Latency, bytes, retries, 429s and sleep time per endpoint are collected
+when a RequestMetrics is given (see RequestMetrics).
 """
+import asyncio
+import codecs
+import copy
+import json
+import re
+import threading
 import time
 from typing import Dict
+from urllib.parse import urlsplit
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+# known rate limits per host: requests per second
+RATE_LIMITS = {
+    'api.etherscan.io': 5,
+    'api.bscscan.com': 5,
+    'api.polygonscan.com': 5,
+}
+
+
+class TokenBucket():
+    """
+    Token bucket rate limiter, safe for threads and async tasks
+
+    Each request takes a token, tokens are added with rate per second
+    up to capacity. A request without a token reserves the next token
+    and waits for it, so waiting requests are served in order.
+
+    rate = tokens per second, None for no limit (only pauses)
+    capacity = maximum number of tokens (burst), default rate
+    """
+
+    def __init__(self, rate: float = None, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate or 1
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens since the last update
+        During a pause updated is in the future, no tokens are added
+        """
+        if self.rate is not None and now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _reserve(self) -> float:
+        """Take a token, returns the time to wait before it may be used
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.rate is None:
+                return max(self.paused_until - now, 0.0)
+            self._refill(now)
+            self.tokens -= 1
+            return max(self.updated - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+
+    def acquire(self) -> float:
+        """Wait for a token (blocking the thread)
+
+        returns the seconds waited
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait for a token (without blocking the event loop)
+
+        returns the seconds waited
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a number of seconds (429 Retry-After)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            # one request directly after the pause, then at rate
+            self.tokens = min(self.tokens, 1)
+            self.updated = max(self.updated, self.paused_until)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(url: str, create: bool = False) -> TokenBucket:
+    """Get the shared token bucket of the host of an url
+
+    create = create a bucket without rate limit for an unknown host
+    returns None for an unknown host without create
+    """
+    host = urlsplit(url).hostname or url
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None and (create or host in RATE_LIMITS):
+            limiter = TokenBucket(RATE_LIMITS.get(host))
+            _rate_limiters[host] = limiter
+        return limiter
+
+
+def set_rate_limit(host: str, rate: float, capacity: float = None):
+    """Set the rate limit (requests per second) of a host
+    """
+    with _rate_limiters_lock:
+        RATE_LIMITS[host] = rate
+        _rate_limiters[host] = TokenBucket(rate, capacity)
+
+
+def retry_after_time(response, retry: int) -> float:
+    """Seconds to wait after a 429 response
+
+    Retry-After header when given, otherwise exponential backoff
+    """
+    if 'Retry-After' in response.headers:
+        try:
+            return int(response.headers['Retry-After']) + 1
+        except ValueError:
+            pass
+    return min(2**retry, 60)
+
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+_json_decoder = json.JSONDecoder()
+# characters which can follow a complete json value
+_delimiters = frozenset(',]}: \t\n\r')
+
+
+class JsonStream():
+    """
+    Text buffer over the chunks of a json response
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+
+    def more(self) -> bool:
+        """Add the next chunk to the buffer, drop the parsed part
+
+        returns False at the end of the response
+        """
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        self.buf = self.buf[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def skip_whitespace(self):
+        self.pos = _whitespace.match(self.buf, self.pos).end()
+
+    def peek(self) -> str:
+        """Next character after whitespace, empty at the end of the response
+        """
+        self.skip_whitespace()
+        while self.pos >= len(self.buf):
+            if not self.more():
+                return ''
+            self.skip_whitespace()
+        return self.buf[self.pos]
+
+    def value(self):
+        """Decode the next json value
+
+        A value is only complete when it is followed by a json delimiter,
+        otherwise a number at the end of a chunk could be cut off (4. + 5)
+        """
+        self.peek()
+        while True:
+            try:
+                val, end = _json_decoder.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) and self.buf[end] in _delimiters:
+                    self.pos = end
+                    return val
+            except json.JSONDecodeError:
+                pass
+            if not self.more():
+                val, self.pos = _json_decoder.raw_decode(self.buf, self.pos)
+                return val
+
+
+def iter_json_array(chunks, key='result'):
+    """Incremental parser, yields the records of a json array
+
+    chunks = iterable of bytes (response.iter_content)
+    key = key of the array in the top level json object,
+          None when the top level value is the array
+    raises ValueError when the key is missing or its value is not an array
+    """
+    stream = JsonStream(chunks)
+    if key is not None:
+        if stream.peek() != '{':
+            raise ValueError('Response is not a json object')
+        stream.pos += 1
+        while True:
+            if stream.peek() in ('}', ''):
+                # e.g. an error object without the result
+                raise ValueError('Response has no %s key' % key)
+            name = stream.value()
+            if stream.peek() != ':':
+                raise ValueError('Invalid json object in response')
+            stream.pos += 1
+            if name == key:
+                break
+            stream.value()
+            if stream.peek() == ',':
+                stream.pos += 1
+
+    if stream.peek() != '[':
+        # e.g. an error message instead of the result array
+        raise ValueError('Response %s is not a json array: %s' % (key, stream.value()))
+    stream.pos += 1
+    while True:
+        char = stream.peek()
+        if char == ']':
+            return
+        if char == ',':
+            stream.pos += 1
+            continue
+        if char == '':
+            raise ValueError('Incomplete json array in response')
+        yield stream.value()
+
+
+class InFlightRequest():
+    """
+    Request in flight, shared by the threads asking for the same url
+
+    resp is only read by the waiting threads, each gets its own copy
+    """
+    __slots__ = ('event', 'resp', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.resp = None
+        self.error = None
+        self.waiters = 0
+
 
 class RequestHelper():
     """
     Functions to help requesting response from an API
     """
 
-    def __init__(self):
+    # number of retries after a 429 response
+    retry_429 = 5
+
+    def __init__(self, cache=None, metrics=None):
+        """
+        cache = optional ResponseCache for responses of urls with a time to live
+        metrics = optional RequestMetrics to collect request metrics
+        """
         self.session = self._init_session()
+        self.cache = cache
+        self.metrics = metrics
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        self.coalesced = 0
 
     @staticmethod
     def _init_session():
@@ -44,6 +314,46 @@ class RequestHelper():
         self.session.headers.update(params)
 
     def get_request_response(self, url, stream=False) -> dict:
+        """general request url function, identical requests in flight are coalesced
+
+        url = api url for request
+        stream = do not wait for the full body before returning (not coalesced)
+        """
+        if stream:
+            return self._get_request_response(url, stream)
+
+        with self.in_flight_lock:
+            request = self.in_flight.get(url)
+            leader = request is None
+            if leader:
+                request = InFlightRequest()
+                self.in_flight[url] = request
+            else:
+                request.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            request.event.wait()
+            if request.error is not None:
+                raise request.error
+            # each waiting thread gets its own copy
+            return copy.deepcopy(request.resp)
+
+        try:
+            request.resp = self._get_request_response(url, stream)
+        except BaseException as e:
+            request.error = e
+            raise
+        finally:
+            with self.in_flight_lock:
+                del self.in_flight[url]
+                waiters = request.waiters
+            request.event.set()
+        # the leader gets a copy too when waiting threads copy the shared response,
+        # no thread can join after the request is removed from in_flight
+        return copy.deepcopy(request.resp) if waiters else request.resp
+
+    def _get_request_response(self, url, stream=False) -> dict:
         """general request url function 
 
         should be a class, with _init etc
@@ -58,29 +368,24 @@ class RequestHelper():
         #print('URL: ', url)
 
         resp = {}
-        response = requests.Response
         request_timeout = 120
 
-        try:
-            while True:
-                response = self.session.get(
-                    url, timeout=request_timeout, stream=stream, verify=True)
-                if response.status_code == 429:
-                    if 'Retry-After' in response.headers.keys():
-                        sleep_time = int(response.headers['Retry-After'])+1
-                        self.sleep_print_time(sleep_time)
-                    else:
-                        raise requests.exceptions.RequestException
-                else:
-                    break
-        except requests.exceptions.RequestException:
-            print('Header request exception:', response.headers)
-            print(response.text)
-            raise
-        except Exception:
-            print('Exception:', response.headers)
-            print(response.text)
-            raise
+        # cached response, an expired response with an etag is revalidated
+        entry = None
+        headers = None
+        if self.cache is not None and not stream and self.cache.ttl_for(url)[0]:
+            entry = self.cache.get(url)
+            if entry is not None:
+                if entry.fresh():
+                    return entry.response()
+                if entry.etag:
+                    headers = {'If-None-Match': entry.etag}
+
+        response = self._send(url, request_timeout, stream, headers)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.renew(url, entry)
+            return entry.response()
 
         try:
             # get json from response, with type dict (mostly) or type list (Alcor exchange)
@@ -114,8 +419,98 @@ class RequestHelper():
             resp.update({'status_code': 'error'})
             resp.update({'prices': []})
 
+        # no caching of errors, also not of an Etherscan status 0 (NOTOK)
+        if self.cache is not None and not stream and resp.get('status_code') == 200 and \
+                resp.get('status') != '0':
+            self.cache.put(url, resp, response.headers.get('ETag'))
+
         return resp
 
+    def _send(self, url, request_timeout, stream=False, headers=None):
+        """Send a GET request, paced by the rate limiter of the host
+
+        A 429 response pauses the rate limiter and the request is sent again
+        """
+        response = requests.Response
+        limiter = get_rate_limiter(url)
+        retry = 0
+
+        try:
+            while True:
+                if limiter:
+                    wait = limiter.acquire()
+                    if self.metrics is not None:
+                        self.metrics.record_sleep(url, wait)
+                if self.metrics is None:
+                    response = self.session.get(
+                        url, timeout=request_timeout, stream=stream, verify=True, headers=headers)
+                else:
+                    response = self._get_measured(url, request_timeout, stream, headers)
+                if response.status_code == 429:
+                    retry += 1
+                    if retry > self.retry_429:
+                        raise requests.exceptions.RequestException(response=response)
+                    sleep_time = retry_after_time(response, retry)
+                    print('429 Too Many Requests, retrying in %s s' % (sleep_time))
+                    # pause the shared bucket, the other threads wait too
+                    limiter = get_rate_limiter(url, create=True)
+                    limiter.pause(sleep_time)
+                else:
+                    break
+        except requests.exceptions.RequestException:
+            print('Header request exception:', response.headers)
+            print(response.text)
+            raise
+        except Exception:
+            print('Exception:', response.headers)
+            print(response.text)
+            raise
+        return response
+
+    def _get_measured(self, url, request_timeout, stream=False, headers=None):
+        """GET request with latency, bytes and the retries of urllib3 recorded in the metrics
+
+        The bytes of a streamed response are recorded while it is read
+        """
+        start = time.monotonic()
+        try:
+            response = self.session.get(
+                url, timeout=request_timeout, stream=stream, verify=True, headers=headers)
+        except requests.exceptions.RequestException:
+            self.metrics.record_request(url, time.monotonic() - start, None)
+            raise
+        retries = getattr(response.raw, 'retries', None)
+        self.metrics.record_request(
+            url, time.monotonic() - start, response.status_code,
+            0 if stream else len(response.content),
+            len(retries.history) if retries is not None else 0)
+        return response
+
+    def iter_request_results(self, url, key='result', chunk_size=64*1024):
+        """Request url and yield the records of a json array in the response,
+        while the response is downloaded
+
+        The full response is never in memory, only the current chunk and record
+
+        url = api url for request
+        key = key of the array in the top level json object,
+              None when the response is a json array
+        """
+        response = self._send(url, 120, stream=True)
+        with response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size)
+            if self.metrics is not None:
+                chunks = self._count_chunks(url, chunks)
+            yield from iter_json_array(chunks, key)
+
+    def _count_chunks(self, url, chunks):
+        """Record the bytes of the chunks of a streamed response in the metrics
+        """
+        for chunk in chunks:
+            self.metrics.record_bytes(url, len(chunk))
+            yield chunk
+
     def api_url_params(self, url, params: dict, api_url_has_params=False):
         """
         Add params to the url
@@ -0,0 +1,243 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Instrumentation of the http requests of RequestHelper and AsyncRequestHelper
+
+Per host and endpoint: latency histogram, bytes received, urllib3 retries,
+429 responses and time spent sleeping (rate limiter and Retry-After).
+Metrics are only collected when a RequestMetrics is given to the helper,
+without it the helpers skip all instrumentation.
+
+Sinks:
+1: RequestMetrics.snapshot(), dictionary for use in the process
+2: LogSink, prints a summary line every interval seconds
+3: PrometheusFileSink, writes the Prometheus text format to a file every interval seconds
+
+usage:
+    metrics = RequestMetrics()
+    req = RequestHelper(metrics=metrics)
+    LogSink(metrics, 60).start()
+"""
+import abc
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+# upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def endpoint_of(url: str):
+    """Host and endpoint of an url
+
+    The endpoint is the path, with the module and action for Etherscan like APIs
+    returns tuple (host, endpoint)
+    """
+    parts = urlsplit(url)
+    endpoint = parts.path or '/'
+    if parts.query:
+        query = parse_qs(parts.query)
+        names = [query[name][0] for name in ('module', 'action') if name in query]
+        if names:
+            endpoint += '?' + '.'.join(names)
+    return parts.hostname or '', endpoint
+
+
+class EndpointMetrics():
+    """
+    Counters and latency histogram of one host and endpoint
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.status_429 = 0
+        self.sleep_time = 0.0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe_latency(self, latency: float):
+        self.latency_sum += latency
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[idx] += 1
+                return
+        self.latency_buckets[-1] += 1
+
+    def as_dict(self) -> dict:
+        return {'requests': self.requests, 'errors': self.errors,
+                'bytes_received': self.bytes_received, 'retries': self.retries,
+                'status_429': self.status_429, 'sleep_time': self.sleep_time,
+                'latency_sum': self.latency_sum,
+                'latency_buckets': dict(zip(LATENCY_BUCKETS + (float('inf'),),
+                                            self.latency_buckets))}
+
+
+class RequestMetrics():
+    """
+    Thread safe collection of request metrics per (host, endpoint)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def _get(self, url: str) -> EndpointMetrics:
+        key = endpoint_of(url)
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            metrics = self.endpoints[key] = EndpointMetrics()
+        return metrics
+
+    def record_request(self, url: str, latency: float, status, bytes_received: int = 0,
+                       retries: int = 0):
+        """Record a finished request
+
+        status = http status code, None for a request which raised an exception
+        retries = number of retries done by urllib3 (or the async helper)
+        """
+        with self.lock:
+            metrics = self._get(url)
+            metrics.requests += 1
+            metrics.retries += retries
+            metrics.bytes_received += bytes_received
+            metrics.observe_latency(latency)
+            if status is None or status >= 400:
+                metrics.errors += 1
+            if status == 429:
+                metrics.status_429 += 1
+
+    def record_sleep(self, url: str, seconds: float):
+        """Record time spent waiting for the rate limiter or a Retry-After
+        """
+        if seconds <= 0:
+            return
+        with self.lock:
+            self._get(url).sleep_time += seconds
+
+    def record_bytes(self, url: str, bytes_received: int):
+        """Record bytes received of a streamed response
+        """
+        with self.lock:
+            self._get(url).bytes_received += bytes_received
+
+    def snapshot(self) -> dict:
+        """Copy of all metrics, dictionary with 'host endpoint': metrics
+        """
+        with self.lock:
+            return {'%s %s' % key: metrics.as_dict() for key, metrics in self.endpoints.items()}
+
+    def summary(self) -> str:
+        """One line summary per host and endpoint
+        """
+        lines = []
+        for name, metrics in sorted(self.snapshot().items()):
+            avg = metrics['latency_sum'] / metrics['requests'] if metrics['requests'] else 0
+            lines.append('%s: %d requests, %d errors, avg %.3f s, %d bytes, %d retries, '
+                         '%d x 429, %.1f s sleeping' % (
+                             name, metrics['requests'], metrics['errors'], avg,
+                             metrics['bytes_received'], metrics['retries'],
+                             metrics['status_429'], metrics['sleep_time']))
+        return '\n'.join(lines)
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format
+        """
+        lines = []
+        counters = [('requests', 'http_requests_total', 'Number of http requests'),
+                    ('errors', 'http_request_errors_total', 'Number of failed http requests'),
+                    ('bytes_received', 'http_received_bytes_total', 'Bytes received'),
+                    ('retries', 'http_retries_total', 'Number of retries'),
+                    ('status_429', 'http_429_total', 'Number of 429 responses'),
+                    ('sleep_time', 'http_sleep_seconds_total', 'Seconds spent sleeping')]
+        snapshot = self.snapshot()
+        with self.lock:
+            keys = sorted(self.endpoints)
+        for field, name, help_text in counters:
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s counter' % name)
+            for host, endpoint in keys:
+                value = snapshot['%s %s' % (host, endpoint)][field]
+                lines.append('%s{host="%s",endpoint="%s"} %s' % (name, host, endpoint, value))
+
+        name = 'http_request_duration_seconds'
+        lines.append('# HELP %s Latency of http requests' % name)
+        lines.append('# TYPE %s histogram' % name)
+        for host, endpoint in keys:
+            metrics = snapshot['%s %s' % (host, endpoint)]
+            labels = 'host="%s",endpoint="%s"' % (host, endpoint)
+            total = 0
+            for bound, count in metrics['latency_buckets'].items():
+                total += count
+                le = '+Inf' if bound == float('inf') else str(bound)
+                lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, le, total))
+            lines.append('%s_sum{%s} %s' % (name, labels, metrics['latency_sum']))
+            lines.append('%s_count{%s} %d' % (name, labels, metrics['requests']))
+        return '\n'.join(lines) + '\n'
+
+
+class PeriodicSink(abc.ABC):
+    """
+    Base class for a sink which is called every interval seconds in a daemon thread
+
+    Subclasses implement emit, see LogSink and PrometheusFileSink
+    """
+
+    def __init__(self, metrics: RequestMetrics, interval: float = 60):
+        self.metrics = metrics
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread, the sink is called a last time
+        """
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.emit()
+        self.emit()
+
+    @abc.abstractmethod
+    def emit(self):
+        """Write the current metrics to the sink
+        """
+
+
+class LogSink(PeriodicSink):
+    """
+    Print the summary of the metrics every interval seconds
+    """
+
+    def emit(self):
+        summary = self.metrics.summary()
+        if summary:
+            print('%s request metrics\n%s' % (time.strftime('%H:%M:%S'), summary))
+
+
+class PrometheusFileSink(PeriodicSink):
+    """
+    Write the metrics in Prometheus text format to a file every interval seconds
+    (for the textfile collector of the node exporter)
+    """
+
+    def __init__(self, metrics: RequestMetrics, path: str, interval: float = 60):
+        super().__init__(metrics, interval)
+        self.path = path
+
+    def emit(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as mfile:
+            mfile.write(self.metrics.prometheus_text())
+        os.replace(tmp_path, self.path)
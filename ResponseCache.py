@@ -0,0 +1,223 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Response cache for RequestHelper
+
+Two tiers: an in memory LRU and an optional sqlite database on disk,
+both bounded by number of entries and bytes.
+The time to live depends on the url, with a list of url patterns.
+A pattern with ttl None never expires (immutable data, like a contract ABI),
+urls without a matching pattern are not cached.
+An expired response with an ETag is revalidated with If-None-Match,
+a 304 Not Modified response renews the cached response.
+The api key is removed from the url before it is used as key, so the key
+is not written to disk and a new key keeps the cached responses.
+
+usage:
+    req = RequestHelper(cache=ResponseCache('output/responses.db'))
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# (url pattern, time to live in seconds), first match is used, None = never expires
+CACHE_TTLS = [
+    (r'[?&]module=contract&action=getabi', None),
+    (r'4byte\.directory/api/v1/signatures', 7 * 24 * 3600),
+    (r'api\.waves\.exchange/v1/platforms', 3600),
+]
+
+# apikey parameter of an url, removed from the cache key
+_apikey_param = re.compile(r'([?&])apikey=[^&]*&?', re.IGNORECASE)
+
+
+def cache_key(url: str) -> str:
+    """Url without the apikey parameter
+    """
+    return _apikey_param.sub(lambda match: match.group(1), url).rstrip('?&')
+
+
+class CacheEntry():
+    """
+    Cached response, stored as json text
+    """
+    __slots__ = ('data', 'expires', 'etag')
+
+    def __init__(self, data: str, expires: float, etag: str):
+        self.data = data
+        self.expires = expires
+        self.etag = etag
+
+    def fresh(self) -> bool:
+        return self.expires is None or self.expires > time.time()
+
+    def response(self) -> dict:
+        """New copy of the cached response
+        """
+        return json.loads(self.data)
+
+
+class ResponseCache():
+    """
+    LRU response cache in memory and on disk, with url based time to live
+
+    path = path of the sqlite database for the disk tier, None for memory only
+    max_entries, max_bytes = size of the memory tier
+    disk_max_entries, disk_max_bytes = size of the disk tier
+    ttls = list of (url pattern, ttl), default CACHE_TTLS
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 10000, max_bytes: int = 64 * 1024**2,
+                 disk_max_entries: int = 1000000, disk_max_bytes: int = 1024**3, ttls: list = None):
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or CACHE_TTLS)]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+        self.conn = None
+        if path:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                    url TEXT PRIMARY KEY,
+                                    data TEXT NOT NULL,
+                                    expires REAL,
+                                    etag TEXT,
+                                    size INTEGER NOT NULL,
+                                    accessed REAL NOT NULL)''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            # responses of earlier versions were keyed with the api key in the url
+            self.conn.execute("DELETE FROM responses WHERE url LIKE '%apikey=%'")
+            self.conn.commit()
+            self.disk_entries, self.disk_bytes = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+
+    def ttl_for(self, url: str):
+        """Time to live of an url
+
+        returns (cacheable, ttl), ttl None = never expires
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return True, ttl
+        return False, 0
+
+    def get(self, url: str) -> CacheEntry:
+        """Get the cached entry of an url, also when expired (for revalidation)
+        """
+        url = cache_key(url)
+        with self.lock:
+            entry = self.memory.get(url)
+            if entry is not None:
+                self.memory.move_to_end(url)
+            elif self.conn is not None:
+                row = self.conn.execute(
+                    'SELECT data, expires, etag FROM responses WHERE url = ?', (url,)).fetchone()
+                if row is not None:
+                    entry = CacheEntry(*row)
+                    self.conn.execute('UPDATE responses SET accessed = ? WHERE url = ?',
+                                      (time.time(), url))
+                    self.conn.commit()
+                    self._put_memory(url, entry)
+            if entry is not None and entry.fresh():
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, url: str, resp: dict, etag: str = None):
+        """Store a response of an url
+        """
+        cacheable, ttl = self.ttl_for(url)
+        if not cacheable:
+            return
+        entry = CacheEntry(json.dumps(resp), None if ttl is None else time.time() + ttl, etag)
+        url = cache_key(url)
+        with self.lock:
+            self._put_memory(url, entry)
+            self._put_disk(url, entry)
+
+    def renew(self, url: str, entry: CacheEntry):
+        """Renew an expired entry after a 304 Not Modified response
+        """
+        _, ttl = self.ttl_for(url)
+        entry.expires = None if ttl is None else time.time() + ttl
+        url = cache_key(url)
+        with self.lock:
+            self.revalidated += 1
+            self._put_memory(url, entry)
+            self._put_disk(url, entry)
+
+    def _put_memory(self, url: str, entry: CacheEntry):
+        """Store an entry in the memory tier, least recently used entries are evicted
+        """
+        old = self.memory.pop(url, None)
+        if old is not None:
+            self.memory_bytes -= len(old.data)
+        self.memory[url] = entry
+        self.memory_bytes += len(entry.data)
+        while self.memory and (len(self.memory) > self.max_entries or
+                               self.memory_bytes > self.max_bytes):
+            _, old = self.memory.popitem(last=False)
+            self.memory_bytes -= len(old.data)
+            self.evictions += 1
+
+    def _put_disk(self, url: str, entry: CacheEntry):
+        """Store an entry in the disk tier, least recently used entries are evicted
+        """
+        if self.conn is None:
+            return
+        row = self.conn.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is not None:
+            self.disk_entries -= 1
+            self.disk_bytes -= row[0]
+        self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                          (url, entry.data, entry.expires, entry.etag, len(entry.data), time.time()))
+        self.disk_entries += 1
+        self.disk_bytes += len(entry.data)
+        if self.disk_entries > self.disk_max_entries or self.disk_bytes > self.disk_max_bytes:
+            rows = self.conn.execute('SELECT url, size FROM responses ORDER BY accessed')
+            remove = []
+            for old_url, size in rows:
+                if (self.disk_entries <= self.disk_max_entries * 0.9 and
+                        self.disk_bytes <= self.disk_max_bytes * 0.9):
+                    break
+                remove.append((old_url,))
+                self.disk_entries -= 1
+                self.disk_bytes -= size
+            self.conn.executemany('DELETE FROM responses WHERE url = ?', remove)
+            self.evictions += len(remove)
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        """Counters of the cache
+        """
+        with self.lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated,
+                     'evictions': self.evictions, 'memory_entries': len(self.memory),
+                     'memory_bytes': self.memory_bytes}
+            if self.conn is not None:
+                stats.update({'disk_entries': self.disk_entries, 'disk_bytes': self.disk_bytes})
+            return stats
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
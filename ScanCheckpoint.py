@@ -0,0 +1,99 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Checkpoint for a long running block scan
+
+The checkpoint file records the last fully processed block and the byte
+offset of each output file at that moment. The checkpoint is written to a
+temporary file which replaces the old one, so a crash always leaves a
+complete checkpoint behind.
+On resume the output files are truncated to the recorded offsets, lines
+written after the last checkpoint are removed and written again.
+"""
+import json
+import os
+
+
+class ScanCheckpoint():
+    """
+    Read and commit the checkpoint of a block scan
+
+    path = path of the checkpoint file
+    params = scan parameters (address, end block, ...), a checkpoint with
+             other parameters can not be resumed
+    """
+
+    def __init__(self, path: str, params: dict = None):
+        self.path = path
+        self.params = params or {}
+
+    def load(self) -> dict:
+        """Read the checkpoint
+
+        returns None when there is no checkpoint file
+        raises a ValueError when the checkpoint is from a scan with other parameters
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as cfile:
+            state = json.load(cfile)
+        if state.get('params', {}) != self.params:
+            raise ValueError('Checkpoint %s is from a scan with other parameters: %s' %
+                             (self.path, state.get('params')))
+        return state
+
+    def commit(self, last_block: int, outputs: dict):
+        """Write the checkpoint atomically
+
+        The output files must be flushed to disk before the commit
+
+        last_block = last block of which all transactions are written
+        outputs = dictionary with output file path: byte offset
+        """
+        state = {'last_block': last_block, 'outputs': outputs, 'params': self.params}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as cfile:
+            json.dump(state, cfile)
+            cfile.flush()
+            os.fsync(cfile.fileno())
+        os.replace(tmp_path, self.path)
+        sync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+
+def sync_dir(path: str):
+    """Flush a directory entry to disk, so a renamed file survives a crash
+    Not possible on Windows
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def open_output(path: str, offset: int = None):
+    """Open an output file in binary mode
+
+    offset = None to start a new file,
+             otherwise continue the file after offset (written data after offset is removed)
+    """
+    if offset is None or not os.path.exists(path):
+        if offset:
+            raise ValueError('Output file %s of the checkpoint is missing' % path)
+        return open(path, 'wb')
+    ofile = open(path, 'r+b')
+    ofile.truncate(offset)
+    ofile.seek(offset)
+    return ofile
+
+
+def sync_output(ofile) -> int:
+    """Flush an output file to disk and return its size in bytes
+    """
+    ofile.flush()
+    os.fsync(ofile.fileno())
+    return ofile.tell()
@@ -0,0 +1,299 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Output of the transactions found by a block scan
+
+1: JsonLinesWriter
+Buffered JSON lines file, optionally compressed (gzip or zstd)
+and rotated to a new file after a size or a number of blocks.
+The buffer is compressed as one gzip member / zstd frame, concatenated
+members are read back as one stream (zcat, gzip.open, zstd -d).
+The file is only flushed to disk at a checkpoint.
+
+2: SingleFileOutput
+All transactions in one JSON lines writer,
+with an extra 'address' key for the address that matched
+
+3: AddressFileOutput
+One JSON file per address in an output folder
+
+The outputs return the state of each file on a commit,
+to be saved in a scan checkpoint (see ScanCheckpoint)
+"""
+import glob
+import gzip
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from AddressMatcher import address_to_hex
+from ScanCheckpoint import open_output, sync_output
+from W3BatchRequest import quantity_to_int
+
+COMPRESSION_EXT = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _json_default(val):
+    """Values not known by the json encoder: HexBytes (bytes) and AttributeDict
+    """
+    if isinstance(val, (bytes, bytearray)):
+        return '0x' + bytes(val).hex()
+    if hasattr(val, 'items'):
+        return dict(val)
+    raise TypeError('Object of type %s is not JSON serializable' % type(val).__name__)
+
+
+_json_encoder = json.JSONEncoder(separators=(',', ':'), default=_json_default)
+
+
+# integer fields of a transaction and a log, the raw JSON-RPC hex quantities are
+# written as integers, the same as the web3 formatted transactions of earlier versions
+TX_QUANTITIES = ('blockNumber', 'value', 'gas', 'gasPrice', 'maxFeePerGas',
+                 'maxPriorityFeePerGas', 'nonce', 'transactionIndex', 'v')
+LOG_QUANTITIES = ('blockNumber', 'transactionIndex', 'logIndex')
+
+
+def quantities_to_int(tx) -> dict:
+    """Copy of a transaction with its quantities (and those of its logs) as integers
+    """
+    tx = dict(tx)
+    for key in TX_QUANTITIES:
+        if key in tx:
+            tx[key] = quantity_to_int(tx[key])
+    if tx.get('logs'):
+        tx['logs'] = [dict(log, **{key: quantity_to_int(log[key])
+                                   for key in LOG_QUANTITIES if key in log})
+                      for log in tx['logs']]
+    return tx
+
+
+def tx_to_json(tx):
+    """Transform a dict to a Json
+    In case the values are HexBytes convert to normal hex values
+    Quantities are written as integers (quantities_to_int)
+
+    Only values unknown to the (C) json encoder go through _json_default
+    """
+    return _json_encoder.encode(quantities_to_int(tx))
+
+
+def get_compressor(compression: str):
+    """Function which compresses a block of data to a complete gzip member or zstd frame
+    """
+    if compression is None:
+        return None
+    if compression == 'gzip':
+        return lambda data: gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError('zstd compression needs the zstandard package')
+        return zstandard.ZstdCompressor().compress
+    raise ValueError('Unknown compression: %s' % compression)
+
+
+class JsonLinesWriter():
+    """
+    Buffered and optionally compressed JSON lines file with rotation
+
+    path = path of the output file, the compression extension is added
+    compression = None, 'gzip' or 'zstd'
+    rotate_bytes = start a new file when a file is larger than this (on disk)
+    rotate_blocks = start a new file every rotate_blocks blocks
+    buffer_size = number of bytes kept in memory before writing to the file
+
+    With rotation the files are named <name>.<segment>.<ext>,
+    the segment is a sequence number or the first block of the file.
+    Only one of rotate_bytes and rotate_blocks can be given, the segment
+    numbers of both would collide
+    """
+
+    def __init__(self, path: str, compression: str = None, rotate_bytes: int = None,
+                 rotate_blocks: int = None, buffer_size: int = 1024**2):
+        if rotate_bytes and rotate_blocks:
+            raise ValueError('Rotation by size and by blocks can not be combined')
+        ext = COMPRESSION_EXT[compression]
+        if ext and path.endswith(ext):
+            path = path[:-len(ext)]
+        self.base, self.ext = os.path.splitext(path)
+        self.ext += ext
+        self.compress = get_compressor(compression)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_blocks = rotate_blocks
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.segment = 0
+        self.ofile = None
+
+    def segment_path(self, segment: int) -> str:
+        """Path of the file of a segment
+        """
+        if self.rotate_bytes or self.rotate_blocks:
+            return '%s.%09d%s' % (self.base, segment, self.ext)
+        return self.base + self.ext
+
+    def resume(self, state: dict = None):
+        """Open the output, continue after the checkpoint state when given
+
+        Files of later segments than the checkpoint are removed
+        """
+        segment, offset = (state['segment'], state['offset']) if state else (0, None)
+        if self.rotate_bytes or self.rotate_blocks:
+            for path in glob.glob(glob.escape(self.base) + '.*' + glob.escape(self.ext)):
+                name = path[len(self.base) + 1:len(path) - len(self.ext)]
+                if name.isdigit() and (state is None or int(name) > segment):
+                    os.remove(path)
+        self.segment = segment
+        self.ofile = open_output(self.segment_path(segment), offset)
+
+    def write(self, line: str, block_number: int = None):
+        """Write a line (without newline)
+
+        block_number = block of the line, used for rotation per number of blocks
+        """
+        if self.rotate_blocks and block_number is not None:
+            segment = block_number - block_number % self.rotate_blocks
+            if segment != self.segment:
+                self._rotate(segment)
+        self.buffer.append(line)
+        self.buffer.append('\n')
+        self.buffered += len(line) + 1
+        if self.buffered >= self.buffer_size:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        """Write (compress) the buffer to the file, without flushing to disk
+        """
+        if not self.buffer:
+            return
+        data = ''.join(self.buffer).encode('utf-8')
+        self.buffer = []
+        self.buffered = 0
+        if self.compress:
+            data = self.compress(data)
+        self.ofile.write(data)
+        if self.rotate_bytes and self.ofile.tell() >= self.rotate_bytes:
+            self._rotate(self.segment + 1)
+
+    def _rotate(self, segment: int):
+        """Close the current file and start the file of a new segment
+        An empty file is removed
+        """
+        self._write_buffer()
+        empty = sync_output(self.ofile) == 0
+        self.ofile.close()
+        if empty:
+            os.remove(self.segment_path(self.segment))
+        self.segment = segment
+        self.ofile = open_output(self.segment_path(segment))
+
+    def checkpoint(self) -> dict:
+        """Write the buffer and flush the file to disk
+
+        returns the state to resume from
+        """
+        self._write_buffer()
+        return {'segment': self.segment, 'path': self.segment_path(self.segment),
+                'offset': sync_output(self.ofile)}
+
+    def close(self):
+        self._write_buffer()
+        self.ofile.close()
+
+
+class SingleFileOutput():
+    """
+    Write all matching transactions to one JSON lines writer
+
+    path = path of the output file
+    address_column = add an 'address' key with the matching address
+    other arguments are passed to the JsonLinesWriter
+    """
+
+    def __init__(self, path: str, address_column: bool = True, **writer_args):
+        self.path = path
+        self.address_column = address_column
+        self.writer = JsonLinesWriter(path, **writer_args)
+
+    def resume(self, states: dict = None):
+        """Open the output file, continue after the checkpoint state when given
+        """
+        self.writer.resume(states[self.path] if states else None)
+
+    def write(self, address: bytes, tx):
+        """Write a transaction for an address
+        """
+        if self.address_column:
+            tx = dict(tx, address=address_to_hex(address))
+        self.writer.write(tx_to_json(tx), quantity_to_int(tx.get('blockNumber')))
+
+    def commit(self) -> dict:
+        """Flush to disk, returns dictionary with path: writer state
+        """
+        return {self.path: self.writer.checkpoint()}
+
+    def close(self):
+        self.writer.close()
+
+
+class AddressFileOutput():
+    """
+    Write the matching transactions of each address to its own file
+
+    Lines are kept in memory until a commit, then appended to the files,
+    so the number of open files stays low for thousands of addresses
+
+    folder = output folder, files are named <address>.json
+    compression = None, 'gzip' or 'zstd', each commit appends a gzip member / zstd frame
+    """
+
+    def __init__(self, folder: str, compression: str = None):
+        self.folder = folder
+        self.ext = '.json' + COMPRESSION_EXT[compression]
+        self.compress = get_compressor(compression)
+        self.offsets = {}
+        self.lines = {}
+
+    def path(self, address: bytes) -> str:
+        """Output file path of an address
+        """
+        return os.path.join(self.folder, address_to_hex(address) + self.ext)
+
+    def resume(self, offsets: dict = None):
+        """Truncate the files to the offsets of the checkpoint
+        Files not in the checkpoint are overwritten on the first commit
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        self.offsets = dict(offsets or {})
+        for path, offset in self.offsets.items():
+            open_output(path, offset).close()
+
+    def write(self, address: bytes, tx):
+        """Write a transaction for an address
+        """
+        self.lines.setdefault(address, []).append(tx_to_json(tx) + '\n')
+
+    def commit(self) -> dict:
+        """Append the lines to the files and flush them to disk
+
+        returns dictionary with path: byte offset of all files
+        """
+        for address, lines in self.lines.items():
+            path = self.path(address)
+            data = ''.join(lines).encode('utf-8')
+            if self.compress:
+                data = self.compress(data)
+            with open(path, 'ab' if path in self.offsets else 'wb') as ofile:
+                ofile.write(data)
+                self.offsets[path] = sync_output(ofile)
+        self.lines = {}
+        return dict(self.offsets)
+
+    def close(self):
+        self.commit()
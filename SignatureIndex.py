@@ -0,0 +1,233 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Offline index of 4 byte method selectors and their signatures
+
+A signature dump (4byte.directory export or a folder of contract ABIs) is
+written once (build_index) to a compact binary file sorted by selector.
+SignatureIndex memory maps the file and finds a selector with a binary
+search, opening the file reads only the header.
+
+File layout (all numbers big endian uint32):
+- header: magic, number of selectors N, number of signatures M
+- selectors: N sorted 4 byte selectors
+- ranges: N + 1 first signature numbers, the signatures of selector i are
+  ranges[i] up to ranges[i + 1]
+- offsets: M + 1 offsets in the text, signature j is text[offsets[j]:offsets[j + 1]]
+- text: utf-8 signatures
+
+Supported input files:
+- .csv 4byte export with text_signature and hex_signature columns
+- .json 4byte api pages (results) or list of {text_signature, hex_signature}
+- .txt one signature per line, optionally preceded by its selector
+- folder with ABIs (.json): plain ABI, etherscan getabi response or
+  compiler artifact with an abi key
+
+usage:
+    build_index(iter_sources(['4byte_export.csv', 'abis']), 'output/signatures.idx')
+    index = SignatureIndex('output/signatures.idx')
+    signatures = index.lookup('0xa9059cbb')   # ('transfer(address,uint256)',)
+
+    python SignatureIndex.py output/signatures.idx 4byte_export.csv abis
+"""
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+
+from sha3 import keccak_256
+
+MAGIC = b'SIGIDX01'
+HEADER = struct.Struct('>8sII')
+
+
+def method_selector(signature: str) -> bytes:
+    """4 byte selector of a text signature: first 4 bytes of the keccak hash
+    """
+    return keccak_256(signature.encode('utf-8')).digest()[:4]
+
+
+def abi_type(param: dict) -> str:
+    """Canonical type of an ABI parameter, a tuple is written as (type1,type2,...)
+    """
+    kind = param['type']
+    if kind.startswith('tuple'):
+        return '(%s)%s' % (','.join(abi_type(comp) for comp in param.get('components', [])),
+                           kind[len('tuple'):])
+    return kind
+
+
+def abi_signatures(abi: list):
+    """Text signatures of the functions of an ABI
+    """
+    for item in abi:
+        if item.get('type', 'function') == 'function' and 'name' in item:
+            yield '%s(%s)' % (item['name'], ','.join(abi_type(inp) for inp in item.get('inputs', [])))
+
+
+def _selector_bytes(hex_signature: str) -> bytes:
+    return bytes.fromhex(hex_signature[2:] if hex_signature.startswith('0x') else hex_signature)
+
+
+def iter_abi_file(path: str):
+    """(selector, signature) of the functions of an ABI file
+    """
+    with open(path, 'r', encoding='utf-8') as ifile:
+        data = json.load(ifile)
+    if isinstance(data, dict):
+        data = data.get('abi', data.get('result', []))
+    if isinstance(data, str):
+        # etherscan getabi returns the ABI as json string
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return
+    for signature in abi_signatures(data):
+        yield method_selector(signature), signature
+
+
+def iter_export_file(path: str):
+    """(selector, signature) of a 4byte export file (.csv, .json or .txt)
+    """
+    with open(path, 'r', encoding='utf-8') as ifile:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(ifile):
+                yield _selector_bytes(row['hex_signature']), row['text_signature']
+        elif path.endswith('.json'):
+            data = json.load(ifile)
+            if isinstance(data, dict):
+                data = data.get('results', [])
+            for row in data:
+                yield _selector_bytes(row['hex_signature']), row['text_signature']
+        else:
+            for line in ifile:
+                parts = line.split()
+                if len(parts) == 2:
+                    yield _selector_bytes(parts[0]), parts[1]
+                elif len(parts) == 1:
+                    yield method_selector(parts[0]), parts[0]
+
+
+def iter_sources(paths: list):
+    """(selector, signature) of export files and ABI folders
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith('.json'):
+                        yield from iter_abi_file(os.path.join(root, name))
+        else:
+            yield from iter_export_file(path)
+
+
+def build_index(pairs, path: str) -> int:
+    """Write the index file of (selector, signature) pairs, duplicates are removed
+
+    returns number of signatures
+    """
+    entries = sorted(set((selector, signature) for selector, signature in pairs
+                         if len(selector) == 4))
+    selectors = []
+    ranges = []
+    offsets = [0]
+    texts = []
+    for selector, signature in entries:
+        if not selectors or selectors[-1] != selector:
+            selectors.append(selector)
+            ranges.append(len(texts))
+        text = signature.encode('utf-8')
+        texts.append(text)
+        offsets.append(offsets[-1] + len(text))
+    ranges.append(len(texts))
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as ofile:
+        ofile.write(HEADER.pack(MAGIC, len(selectors), len(texts)))
+        ofile.write(b''.join(selectors))
+        ofile.write(struct.pack('>%sI' % len(ranges), *ranges))
+        ofile.write(struct.pack('>%sI' % len(offsets), *offsets))
+        ofile.write(b''.join(texts))
+    os.replace(tmp_path, path)
+    return len(texts)
+
+
+class SignatureIndex():
+    """
+    Memory mapped index file of build_index
+
+    path = path of the index file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as ifile:
+            self.mm = mmap.mmap(ifile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.selectors, self.signatures = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a signature index' % path)
+        self.selectors_pos = HEADER.size
+        self.ranges_pos = self.selectors_pos + 4 * self.selectors
+        self.offsets_pos = self.ranges_pos + 4 * (self.selectors + 1)
+        self.text_pos = self.offsets_pos + 4 * (self.signatures + 1)
+
+    def __len__(self):
+        return self.selectors
+
+    def _find(self, selector: bytes) -> int:
+        """Position of a selector, -1 when not in the index
+        """
+        mm = self.mm
+        base = self.selectors_pos
+        low, high = 0, self.selectors
+        while low < high:
+            mid = (low + high) // 2
+            pos = base + 4 * mid
+            value = mm[pos:pos + 4]
+            if value < selector:
+                low = mid + 1
+            elif value > selector:
+                high = mid
+            else:
+                return mid
+        return -1
+
+    def lookup(self, selector: str) -> tuple:
+        """Signatures of a selector (0x with 8 hex characters), empty when not in the index
+        """
+        idx = self._find(_selector_bytes(selector))
+        if idx < 0:
+            return ()
+        first, last = struct.unpack_from('>II', self.mm, self.ranges_pos + 4 * idx)
+        offsets = struct.unpack_from('>%sI' % (last - first + 1), self.mm,
+                                     self.offsets_pos + 4 * first)
+        text_pos = self.text_pos
+        return tuple(self.mm[text_pos + start:text_pos + end].decode('utf-8')
+                     for start, end in zip(offsets, offsets[1:]))
+
+    def __contains__(self, selector: str) -> bool:
+        return self._find(_selector_bytes(selector)) >= 0
+
+    def close(self):
+        self.mm.close()
+
+
+def __main__():
+    if len(sys.argv) < 3:
+        print('usage: python SignatureIndex.py <index file> <export file or abi folder> ...')
+        return
+    count = build_index(iter_sources(sys.argv[2:]), sys.argv[1])
+    index = SignatureIndex(sys.argv[1])
+    print('%s signatures of %s selectors written to %s' % (count, len(index), sys.argv[1]))
+    index.close()
+
+
+if __name__ == '__main__':
+    __main__()
@@ -0,0 +1,328 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Local store of 4 byte method selectors and their signatures
+
+1: SignatureStore, selector to signatures of www.4byte.directory
+
+Lookups go to an in memory LRU, then to a sqlite database on disk and only
+for a new selector to www.4byte.directory. The answer is stored, also when
+the selector is unknown (negative cache), so the network is queried once
+per selector. Unknown selectors are asked again after negative_ttl seconds,
+signatures are added to 4byte.directory over time.
+A network error is not stored.
+
+2: ContractSelectorStore, selector to signature table of each contract
+The table is built once from the contract ABI (etherscan getabi) and kept
+in memory and in the same sqlite database, an unverified contract has an
+empty table which is asked again after negative_ttl.
+The implementation of a proxy contract ('' when not a proxy) is kept next
+to the table, and resolved again after implementation_ttl (upgrades).
+
+usage:
+    store = SignatureStore('output/signatures.db')
+    signatures = store.lookup('0xa9059cbb')   # ['transfer(address,uint256)']
+    contracts = ContractSelectorStore('output/signatures.db')
+    table = contracts.lookup('0xdac17f958d2ee523a2206206994597c13d831ec7')
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from RequestHelper import RequestHelper
+from SignatureIndex import abi_signatures, method_selector
+
+URL_4BYTE = 'https://www.4byte.directory/api/v1/signatures/?hex_signature='
+
+_request_helper = None
+
+
+def fetch_4byte(selector: str) -> list:
+    """Signatures of a selector on www.4byte.directory
+
+    returns list of text signatures, None on a network or api error
+    """
+    global _request_helper
+    if _request_helper is None:
+        _request_helper = RequestHelper()
+    try:
+        resp = _request_helper.get_request_response(URL_4BYTE + selector)
+    except Exception as e:
+        print('4byte request error: %s' % e)
+        return None
+    if resp.get('status_code') != 200 or 'results' not in resp:
+        return None
+    return [result['text_signature'] for result in resp['results']]
+
+
+def fetch_contract_abi(contract_addr: str) -> list:
+    """ABI of a verified contract on etherscan
+
+    returns the ABI, an empty list when the contract is not verified,
+    None on a network or api error (rate limit)
+    """
+    global _request_helper
+    if _request_helper is None:
+        _request_helper = RequestHelper()
+    url = _request_helper.api_url_params(config.ETHERSCAN_URL, {
+        'module': 'contract', 'action': 'getabi', 'address': contract_addr,
+        'apikey': config.ETHERSCAN_API})
+    try:
+        resp = _request_helper.get_request_response(url)
+    except Exception as e:
+        print('getabi request error: %s' % e)
+        return None
+    if resp.get('status') == '1':
+        return json.loads(resp['result'])
+    if 'not verified' in str(resp.get('result', '')):
+        return []
+    return None
+
+
+def selector_table(abi: list) -> dict:
+    """Selector (0x with 8 hex characters) to signature of the functions of an ABI
+    """
+    return {'0x' + method_selector(signature).hex(): signature for signature in abi_signatures(abi)}
+
+
+def _open_db(path: str):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+class SignatureStore():
+    """
+    Selector to signatures store: memory LRU, sqlite on disk, network
+
+    path = path of the sqlite database, None for memory only
+    max_entries = number of selectors in the memory LRU
+    negative_ttl = seconds before an unknown selector is asked again
+    fetch = function selector -> list of signatures (None on error)
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 100000,
+                 negative_ttl: float = 7 * 24 * 3600, fetch=fetch_4byte):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.fetches = 0
+
+        self.conn = None
+        if path:
+            self.conn = _open_db(path)
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS signatures (
+                                    selector TEXT PRIMARY KEY,
+                                    signatures TEXT NOT NULL,
+                                    fetched REAL NOT NULL)''')
+            self.conn.commit()
+
+    def _fresh(self, signatures: tuple, fetched: float) -> bool:
+        """A known selector never expires, an unknown one after negative_ttl
+        """
+        return bool(signatures) or fetched + self.negative_ttl > time.time()
+
+    def _put_memory(self, selector: str, entry: tuple):
+        self.memory[selector] = entry
+        self.memory.move_to_end(selector)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, selector: str) -> tuple:
+        """Stored signatures of a selector, None when not stored or expired
+        """
+        with self.lock:
+            entry = self.memory.get(selector)
+            if entry is not None:
+                self.memory.move_to_end(selector)
+            elif self.conn is not None:
+                row = self.conn.execute('SELECT signatures, fetched FROM signatures '
+                                        'WHERE selector = ?', (selector,)).fetchone()
+                if row is not None:
+                    entry = (tuple(row[0].split(';')) if row[0] else (), row[1])
+                    self._put_memory(selector, entry)
+            if entry is None or not self._fresh(*entry):
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, selector: str, signatures: list):
+        """Store the signatures of a selector, an empty list for an unknown selector
+        """
+        entry = (tuple(signatures), time.time())
+        with self.lock:
+            self._put_memory(selector, entry)
+            if self.conn is not None:
+                self.conn.execute('INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)',
+                                  (selector, ';'.join(entry[0]), entry[1]))
+                self.conn.commit()
+
+    def lookup(self, selector: str) -> tuple:
+        """Signatures of a selector, from the store or else from the network
+
+        selector = 0x with 8 hex characters
+        returns tuple of text signatures, empty when unknown
+        """
+        selector = selector.lower()
+        signatures = self.get(selector)
+        if signatures is not None:
+            return signatures
+        signatures = self.fetch(selector)
+        if signatures is None:
+            return ()
+        self.fetches += 1
+        self.put(selector, signatures)
+        return tuple(signatures)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'hits': self.hits, 'fetches': self.fetches, 'memory_entries': len(self.memory)}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class ContractSelectorStore():
+    """
+    Contract to selector table store: memory LRU, sqlite on disk, etherscan ABI
+
+    path = path of the sqlite database, None for memory only
+    max_entries = number of contracts in the memory LRU
+    negative_ttl = seconds before the ABI of an unverified contract is asked again
+    implementation_ttl = seconds before the implementation of a contract is resolved again
+    fetch = function contract address -> ABI (empty when not verified, None on error)
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 10000,
+                 negative_ttl: float = 7 * 24 * 3600, implementation_ttl: float = 24 * 3600,
+                 fetch=fetch_contract_abi):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.implementation_ttl = implementation_ttl
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.implementations = OrderedDict()
+        self.hits = 0
+        self.fetches = 0
+
+        self.conn = None
+        if path:
+            self.conn = _open_db(path)
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS contract_selectors (
+                                    address TEXT PRIMARY KEY,
+                                    selectors TEXT NOT NULL,
+                                    fetched REAL NOT NULL)''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS contract_implementations (
+                                    address TEXT PRIMARY KEY,
+                                    implementation TEXT NOT NULL,
+                                    resolved REAL NOT NULL)''')
+            self.conn.commit()
+
+    def _put_memory(self, address: str, entry: tuple, memory: OrderedDict = None):
+        memory = self.memory if memory is None else memory
+        memory[address] = entry
+        memory.move_to_end(address)
+        while len(memory) > self.max_entries:
+            memory.popitem(last=False)
+
+    def get(self, address: str) -> dict:
+        """Stored selector table of a contract, None when not stored or expired
+        """
+        with self.lock:
+            entry = self.memory.get(address)
+            if entry is not None:
+                self.memory.move_to_end(address)
+            elif self.conn is not None:
+                row = self.conn.execute('SELECT selectors, fetched FROM contract_selectors '
+                                        'WHERE address = ?', (address,)).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self._put_memory(address, entry)
+            if entry is None or not (entry[0] or entry[1] + self.negative_ttl > time.time()):
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, address: str, table: dict):
+        """Store the selector table of a contract, an empty table for an unverified contract
+        """
+        entry = (table, time.time())
+        with self.lock:
+            self._put_memory(address, entry)
+            if self.conn is not None:
+                self.conn.execute('INSERT OR REPLACE INTO contract_selectors VALUES (?, ?, ?)',
+                                  (address, json.dumps(table), entry[1]))
+                self.conn.commit()
+
+    def lookup(self, address: str) -> dict:
+        """Selector table of a contract, from the store or else from its ABI
+
+        returns dict selector -> signature, empty when unknown
+        """
+        address = address.lower()
+        table = self.get(address)
+        if table is not None:
+            return table
+        abi = self.fetch(address)
+        if abi is None:
+            return {}
+        self.fetches += 1
+        table = selector_table(abi)
+        self.put(address, table)
+        return table
+
+    def get_implementation(self, address: str) -> str:
+        """Stored implementation of a contract, '' when not a proxy,
+        None when not stored or expired
+        """
+        address = address.lower()
+        with self.lock:
+            entry = self.implementations.get(address)
+            if entry is not None:
+                self.implementations.move_to_end(address)
+            elif self.conn is not None:
+                row = self.conn.execute('SELECT implementation, resolved FROM contract_implementations '
+                                        'WHERE address = ?', (address,)).fetchone()
+                if row is not None:
+                    entry = tuple(row)
+                    self._put_memory(address, entry, self.implementations)
+            if entry is None or entry[1] + self.implementation_ttl <= time.time():
+                return None
+            return entry[0]
+
+    def put_implementation(self, address: str, implementation: str):
+        """Store the implementation of a contract, '' when not a proxy
+        """
+        address = address.lower()
+        entry = (implementation.lower(), time.time())
+        with self.lock:
+            self._put_memory(address, entry, self.implementations)
+            if self.conn is not None:
+                self.conn.execute('INSERT OR REPLACE INTO contract_implementations VALUES (?, ?, ?)',
+                                  (address,) + entry)
+                self.conn.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'hits': self.hits, 'fetches': self.fetches, 'memory_entries': len(self.memory),
+                    'implementations': len(self.implementations)}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
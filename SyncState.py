@@ -0,0 +1,168 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Incremental sync of account records (transactions, transfers)
+
+The sync state database records per (chain, endpoint, address) the highest
+block ingested, the committed size of the dataset file and the start of the
+tail of the dataset: the first block which is requested again on the next
+sync (reorg safety margin) and the byte offset of its first record.
+A sync truncates the dataset to the tail offset, requests the records
+from the tail block and appends them, so only new blocks are downloaded.
+
+The dataset is a JSON lines file per (chain, endpoint, address).
+The file is flushed to disk before the state is updated, after a crash
+the file is truncated to the offset of the last committed state.
+
+usage:
+    state = SyncState('output/sync.db')
+    dataset = SyncDataset(state, 'output/sync', 'eth', 'txlist', address, margin=12)
+    dataset.append(fetcher.fetch('txlist', address, dataset.start_block, end_block), end_block)
+    txs = dataset.read()
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from ScanCheckpoint import open_output, sync_output
+from ScanOutput import tx_to_json
+
+
+class SyncState():
+    """
+    Persistent sync state per (chain, endpoint, address)
+
+    path = path of the sqlite database
+    """
+
+    def __init__(self, path: str):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS sync_state (
+                                chain TEXT NOT NULL,
+                                endpoint TEXT NOT NULL,
+                                address TEXT NOT NULL,
+                                last_block INTEGER NOT NULL,
+                                tail_block INTEGER NOT NULL,
+                                tail_offset INTEGER NOT NULL,
+                                size INTEGER NOT NULL,
+                                PRIMARY KEY (chain, endpoint, address))''')
+        self.conn.commit()
+
+    def get(self, chain: str, endpoint: str, address: str) -> dict:
+        """State of an address, None when it was never synced
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT last_block, tail_block, tail_offset, size FROM sync_state '
+                'WHERE chain = ? AND endpoint = ? AND address = ?',
+                (chain, endpoint, address.lower())).fetchone()
+        if row is None:
+            return None
+        return {'last_block': row[0], 'tail_block': row[1], 'tail_offset': row[2], 'size': row[3]}
+
+    def set(self, chain: str, endpoint: str, address: str, last_block: int,
+            tail_block: int, tail_offset: int, size: int):
+        """Store the state of an address after its dataset is flushed to disk
+
+        size = size of the dataset file, data after it is not committed
+        """
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?, ?, ?)',
+                              (chain, endpoint, address.lower(), last_block, tail_block,
+                               tail_offset, size))
+            self.conn.commit()
+
+    def reset(self, chain: str, endpoint: str, address: str):
+        """Forget the state of an address, the next sync starts at block 0
+        """
+        with self.lock:
+            self.conn.execute('DELETE FROM sync_state WHERE chain = ? AND endpoint = ? AND address = ?',
+                              (chain, endpoint, address.lower()))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class SyncDataset():
+    """
+    JSON lines dataset of one (chain, endpoint, address), synced incrementally
+
+    state = SyncState
+    folder = root folder of the datasets, files are <folder>/<chain>/<endpoint>/<address>.json
+    margin = number of blocks requested again on the next sync (reorg safety margin)
+    block_key = key of the block number in the records
+    """
+
+    def __init__(self, state: SyncState, folder: str, chain: str, endpoint: str, address: str,
+                 margin: int = 0, block_key: str = 'blockNumber'):
+        self.state = state
+        self.chain = chain
+        self.endpoint = endpoint
+        self.address = address
+        self.margin = margin
+        self.block_key = block_key
+        self.path = os.path.join(folder, chain, endpoint, address.lower() + '.json')
+        self.sync = state.get(chain, endpoint, address)
+        if self.sync is not None and not os.path.exists(self.path):
+            print('Dataset %s is missing, full sync' % self.path)
+            self.sync = None
+
+    @property
+    def start_block(self) -> int:
+        """First block to request
+        """
+        return self.sync['tail_block'] if self.sync else 0
+
+    @property
+    def last_block(self) -> int:
+        """Highest block ingested, None when never synced
+        """
+        return self.sync['last_block'] if self.sync else None
+
+    def append(self, records: list, last_block: int):
+        """Replace the tail of the dataset with the records and commit the state
+
+        records = records from start_block up to last_block, in block order
+        last_block = last block of the request (the latest block at the time of the request)
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        start_block = self.start_block
+        tail_block = max(last_block + 1 - self.margin, start_block)
+        with open_output(self.path, self.sync['tail_offset'] if self.sync else None) as ofile:
+            tail_offset = None
+            lines = []
+            for record in records:
+                block = int(record[self.block_key])
+                if block < start_block:
+                    continue
+                if tail_offset is None and block >= tail_block:
+                    ofile.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    tail_offset = ofile.tell()
+                lines.append(tx_to_json(record) + '\n')
+            ofile.write(''.join(lines).encode('utf-8'))
+            size = sync_output(ofile)
+        if tail_offset is None:
+            tail_offset = size
+        self.state.set(self.chain, self.endpoint, self.address, last_block, tail_block,
+                       tail_offset, size)
+        self.sync = {'last_block': last_block, 'tail_block': tail_block,
+                     'tail_offset': tail_offset, 'size': size}
+
+    def read(self) -> list:
+        """All records of the dataset, up to the committed state
+        """
+        if self.sync is None:
+            return []
+        with open(self.path, 'rb') as ifile:
+            data = ifile.read(self.sync['size'])
+        return [json.loads(line) for line in data.splitlines()]
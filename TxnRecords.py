@@ -0,0 +1,323 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Compact typed records of transactions and transfers
+
+A response record (dict of strings) is parsed once into a record with
+__slots__: addresses and hashes as bytes, numbers as int, time as unix
+timestamp. Derived values (time, fee, method id) are properties, so
+nothing is parsed again in later passes.
+Missing addresses (contract creation, no contract) are None.
+
+1: NormalTxn, InternalTxn, TokenTransfer, NftTransfer, MinedBlock
+Parsed from Etherscan (from_etherscan) or Moralis (from_moralis) records
+
+2: TxnColumns
+Column oriented arrays of a list of records, for bulk sets
+
+usage:
+    txs = [NormalTxn.from_etherscan(rec) for rec in resp['result']]
+"""
+import sys
+from array import array
+from datetime import datetime, timezone
+from operator import attrgetter
+
+
+def hex_to_bytes(value: str) -> bytes:
+    """Hex string (with 0x) to bytes, None for an empty value
+    """
+    if not value:
+        return None
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def bytes_to_hex(value: bytes) -> str:
+    """Bytes to hex string with 0x, empty string for None
+    """
+    if value is None:
+        return ''
+    return '0x' + value.hex()
+
+
+def iso_to_timestamp(value: str) -> int:
+    """Moralis block timestamp (2021-05-07T11:08:35.000Z) to unix timestamp
+    """
+    return int(datetime.fromisoformat(value.rstrip('Z')).replace(tzinfo=timezone.utc).timestamp())
+
+
+def intern_str(value: str) -> str:
+    """Intern a string repeated in many records (token name, symbol)
+    """
+    return sys.intern(value) if value else value
+
+
+class Txn():
+    """
+    Fields of all records of an account list
+    """
+    __slots__ = ('block', 'timestamp', 'hash', 'from_address', 'to_address', 'value')
+
+    def __init__(self, block: int, timestamp: int, hash: bytes, from_address: bytes,
+                 to_address: bytes, value: int):
+        self.block = block
+        self.timestamp = timestamp
+        self.hash = hash
+        self.from_address = from_address
+        self.to_address = to_address
+        self.value = value
+
+    @property
+    def time(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp, tz=timezone.utc)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % (name, getattr(self, name)) for cls in type(self).__mro__
+            for name in getattr(cls, '__slots__', ())))
+
+
+class NormalTxn(Txn):
+    """
+    Normal transaction, value in wei
+    """
+    __slots__ = ('nonce', 'gas', 'gas_price', 'gas_used', 'contract_address', 'input', 'is_error')
+
+    def __init__(self, block, timestamp, hash, from_address, to_address, value, nonce: int,
+                 gas: int, gas_price: int, gas_used: int, contract_address: bytes,
+                 input: bytes, is_error: bool):
+        super().__init__(block, timestamp, hash, from_address, to_address, value)
+        self.nonce = nonce
+        self.gas = gas
+        self.gas_price = gas_price
+        self.gas_used = gas_used
+        self.contract_address = contract_address
+        self.input = input
+        self.is_error = is_error
+
+    @property
+    def fee(self) -> int:
+        """Transaction fee in wei
+        """
+        return self.gas_price * self.gas_used
+
+    @property
+    def method_id(self) -> str:
+        """First 4 bytes of the input as hex string, empty for a plain transfer
+        """
+        return '0x' + self.input[:4].hex() if self.input and len(self.input) >= 4 else ''
+
+    @classmethod
+    def from_etherscan(cls, rec: dict):
+        return cls(int(rec['blockNumber']), int(rec['timeStamp']), hex_to_bytes(rec['hash']),
+                   hex_to_bytes(rec['from']), hex_to_bytes(rec['to']), int(rec['value']),
+                   int(rec['nonce']), int(rec['gas']), int(rec['gasPrice']), int(rec['gasUsed']),
+                   hex_to_bytes(rec['contractAddress']), hex_to_bytes(rec['input']),
+                   rec['isError'] == '1')
+
+    @classmethod
+    def from_moralis(cls, rec: dict):
+        return cls(int(rec['block_number']), iso_to_timestamp(rec['block_timestamp']),
+                   hex_to_bytes(rec['hash']), hex_to_bytes(rec['from_address']),
+                   hex_to_bytes(rec['to_address']), int(rec['value']), int(rec['nonce']),
+                   int(rec['gas']), int(rec['gas_price']), int(rec['receipt_gas_used']),
+                   hex_to_bytes(rec['receipt_contract_address']), hex_to_bytes(rec['input']),
+                   rec['receipt_status'] == '0')
+
+
+class InternalTxn(Txn):
+    """
+    Internal transaction (message call of a contract), value in wei
+    """
+    __slots__ = ('contract_address', 'type', 'gas', 'gas_used', 'trace_id', 'is_error')
+
+    def __init__(self, block, timestamp, hash, from_address, to_address, value,
+                 contract_address: bytes, type: str, gas: int, gas_used: int, trace_id: str,
+                 is_error: bool):
+        super().__init__(block, timestamp, hash, from_address, to_address, value)
+        self.contract_address = contract_address
+        self.type = type
+        self.gas = gas
+        self.gas_used = gas_used
+        self.trace_id = trace_id
+        self.is_error = is_error
+
+    @classmethod
+    def from_etherscan(cls, rec: dict):
+        return cls(int(rec['blockNumber']), int(rec['timeStamp']), hex_to_bytes(rec['hash']),
+                   hex_to_bytes(rec['from']), hex_to_bytes(rec['to']), int(rec['value']),
+                   hex_to_bytes(rec['contractAddress']), intern_str(rec['type']),
+                   int(rec['gas']), int(rec['gasUsed']), rec['traceId'], rec['isError'] == '1')
+
+
+class TokenTransfer(Txn):
+    """
+    ERC20 token transfer, value in the smallest unit of the token
+    token_decimal is None when unknown (Moralis)
+    """
+    __slots__ = ('contract_address', 'token_name', 'token_symbol', 'token_decimal',
+                 'gas_price', 'gas_used', 'log_index')
+
+    def __init__(self, block, timestamp, hash, from_address, to_address, value,
+                 contract_address: bytes, token_name: str, token_symbol: str, token_decimal: int,
+                 gas_price: int, gas_used: int, log_index: int):
+        super().__init__(block, timestamp, hash, from_address, to_address, value)
+        self.contract_address = contract_address
+        self.token_name = token_name
+        self.token_symbol = token_symbol
+        self.token_decimal = token_decimal
+        self.gas_price = gas_price
+        self.gas_used = gas_used
+        self.log_index = log_index
+
+    @property
+    def fee(self) -> int:
+        """Transaction fee in wei, 0 when unknown
+        """
+        return (self.gas_price or 0) * (self.gas_used or 0)
+
+    @property
+    def amount(self) -> float:
+        """Value in tokens (for display)
+        """
+        return self.value / 10**(self.token_decimal or 0)
+
+    @classmethod
+    def from_etherscan(cls, rec: dict):
+        log_index = rec.get('logIndex')
+        return cls(int(rec['blockNumber']), int(rec['timeStamp']), hex_to_bytes(rec['hash']),
+                   hex_to_bytes(rec['from']), hex_to_bytes(rec['to']), int(rec['value']),
+                   hex_to_bytes(rec['contractAddress']), intern_str(rec['tokenName']),
+                   intern_str(rec['tokenSymbol']), int(rec['tokenDecimal'] or 0),
+                   int(rec['gasPrice']), int(rec['gasUsed']),
+                   int(log_index) if log_index else None)
+
+    @classmethod
+    def from_moralis(cls, rec: dict):
+        log_index = rec.get('log_index')
+        return cls(int(rec['block_number']), iso_to_timestamp(rec['block_timestamp']),
+                   hex_to_bytes(rec['transaction_hash']), hex_to_bytes(rec['from_address']),
+                   hex_to_bytes(rec['to_address']), int(rec['value']),
+                   hex_to_bytes(rec['address']), None, None, None, None, None,
+                   int(log_index) if log_index is not None else None)
+
+
+class NftTransfer(Txn):
+    """
+    ERC721 (or ERC1155) token transfer, amount is the number of tokens
+    value is always 0 for both sources: Etherscan does not return the ether
+    value of the transaction, so the Moralis value is not used either
+    """
+    __slots__ = ('contract_address', 'token_id', 'token_name', 'token_symbol', 'amount',
+                 'gas_price', 'gas_used', 'log_index')
+
+    def __init__(self, block, timestamp, hash, from_address, to_address, value,
+                 contract_address: bytes, token_id: int, token_name: str, token_symbol: str,
+                 amount: int, gas_price: int, gas_used: int, log_index: int):
+        super().__init__(block, timestamp, hash, from_address, to_address, value)
+        self.contract_address = contract_address
+        self.token_id = token_id
+        self.token_name = token_name
+        self.token_symbol = token_symbol
+        self.amount = amount
+        self.gas_price = gas_price
+        self.gas_used = gas_used
+        self.log_index = log_index
+
+    @property
+    def fee(self) -> int:
+        """Transaction fee in wei, 0 when unknown
+        """
+        return (self.gas_price or 0) * (self.gas_used or 0)
+
+    @classmethod
+    def from_etherscan(cls, rec: dict):
+        log_index = rec.get('logIndex')
+        return cls(int(rec['blockNumber']), int(rec['timeStamp']), hex_to_bytes(rec['hash']),
+                   hex_to_bytes(rec['from']), hex_to_bytes(rec['to']), 0,
+                   hex_to_bytes(rec['contractAddress']), int(rec['tokenID']),
+                   intern_str(rec['tokenName']), intern_str(rec['tokenSymbol']), 1,
+                   int(rec['gasPrice']), int(rec['gasUsed']),
+                   int(log_index) if log_index else None)
+
+    @classmethod
+    def from_moralis(cls, rec: dict):
+        log_index = rec.get('log_index')
+        return cls(int(rec['block_number']), iso_to_timestamp(rec['block_timestamp']),
+                   hex_to_bytes(rec['transaction_hash']), hex_to_bytes(rec['from_address']),
+                   hex_to_bytes(rec['to_address']), 0,
+                   hex_to_bytes(rec['token_address']), int(rec['token_id']), None, None,
+                   int(rec.get('amount') or 1), None, None,
+                   int(log_index) if log_index is not None else None)
+
+
+class MinedBlock():
+    """
+    Block mined by an address, reward in wei
+    """
+    __slots__ = ('block', 'timestamp', 'reward')
+
+    def __init__(self, block: int, timestamp: int, reward: int):
+        self.block = block
+        self.timestamp = timestamp
+        self.reward = reward
+
+    @property
+    def time(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp, tz=timezone.utc)
+
+    @classmethod
+    def from_etherscan(cls, rec: dict):
+        return cls(int(rec['blockNumber']), int(rec['timeStamp']), int(rec['blockReward']))
+
+
+# array typecodes of the integer fields which fit in 64 bits
+INT_COLUMNS = {'block': 'Q', 'timestamp': 'Q', 'nonce': 'Q', 'gas': 'Q', 'gas_price': 'Q',
+               'gas_used': 'Q', 'token_decimal': 'B', 'log_index': 'L'}
+# width of the fixed size bytes fields, a missing value is stored as zeros
+BYTES_COLUMNS = {'hash': 32, 'from_address': 20, 'to_address': 20, 'contract_address': 20}
+
+
+class TxnColumns():
+    """
+    Column oriented storage of records of one type
+
+    Integers which fit in 64 bits are arrays, hashes and addresses are
+    one bytes object per column (fixed width), other fields (256 bit values,
+    strings) are lists. A missing integer is stored as 0.
+
+    records = list of records of the same type
+    fields = names of the columns, default all fields of the records
+    """
+
+    def __init__(self, records: list, fields: list = None):
+        if fields is None and records:
+            fields = [name for cls in reversed(type(records[0]).__mro__)
+                      for name in getattr(cls, '__slots__', ())]
+        self.fields = fields or []
+        self.length = len(records)
+        self.columns = {}
+        for name in self.fields:
+            values = list(map(attrgetter(name), records))
+            if name in INT_COLUMNS:
+                self.columns[name] = array(INT_COLUMNS[name], [value or 0 for value in values])
+            elif name in BYTES_COLUMNS:
+                empty = bytes(BYTES_COLUMNS[name])
+                self.columns[name] = b''.join([value or empty for value in values])
+            else:
+                self.columns[name] = values
+
+    def __len__(self):
+        return self.length
+
+    def get(self, name: str, idx: int):
+        """Value of a field of a record, bytes fields are returned as bytes (None when zeros)
+        """
+        column = self.columns[name]
+        if name in BYTES_COLUMNS:
+            width = BYTES_COLUMNS[name]
+            value = column[idx * width:(idx + 1) * width]
+            return None if value == bytes(width) else value
+        return column[idx]
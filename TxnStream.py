@@ -0,0 +1,215 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Merged transaction stream of several sources
+
+The transactions of Etherscan (EtherscanTxns), Moralis (MoralisTxns) and
+raw blocks (W3TxnsPerBlock output) are normalized into one schema (StreamTxn)
+and merged into one stream in block order. Each source must be in block order.
+
+Duplicates are removed with a bounded hash index: a key is only kept for
+window_blocks blocks after its block, the index never holds more than
+max_keys keys. In a block ordered stream a duplicate is in the same block,
+the window covers sources which disagree on the block (reorg).
+Within a block the sources are merged in the given order, so the first
+(most complete) source is the one which is kept.
+
+Key of a transaction: (hash, kind, index)
+- normal transaction: no index
+- internal transaction: trace id
+- token transfer: contract, token id, from, to and an ordinal, for every
+  source the same fields, because not every source returns the log index
+  of a transfer (Etherscan tokentx). The ordinal numbers equal transfers
+  within a transaction (per source, in stream order), so these are kept.
+  The value is not in the key, sources do not agree on it (NftTransfer)
+
+usage:
+    merger = TxnMerger()
+    for txn in merger.merge(iter_records(result.normal, 'etherscan'),
+                            iter_records(moralis_txs, 'moralis'),
+                            iter_json_lines('transactions.json')):
+        ...
+"""
+import gzip
+import heapq
+import json
+from collections import deque
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from TxnRecords import InternalTxn, NftTransfer, NormalTxn, TokenTransfer, hex_to_bytes
+from W3BatchRequest import quantity_to_int
+
+# kind of transaction of each record type
+RECORD_KINDS = {
+    NormalTxn: 'tx',
+    InternalTxn: 'internal',
+    TokenTransfer: 'erc20',
+    NftTransfer: 'nft',
+}
+
+
+class StreamTxn():
+    """
+    Transaction in the merged stream
+
+    kind = 'tx', 'internal', 'erc20' or 'nft'
+    index = trace id (internal) or log index (transfer) when known
+    timestamp = None when not known by the source (raw blocks)
+    source = name of the source
+    ordinal = number of the transfer among the equal transfers of its transaction
+    """
+    __slots__ = ('block', 'timestamp', 'hash', 'kind', 'index', 'from_address', 'to_address',
+                 'value', 'contract_address', 'token_id', 'source', 'ordinal')
+
+    def __init__(self, block: int, timestamp: int, hash: bytes, kind: str, index,
+                 from_address: bytes, to_address: bytes, value: int,
+                 contract_address: bytes = None, token_id: int = None, source: str = None):
+        self.block = block
+        self.timestamp = timestamp
+        self.hash = hash
+        self.kind = kind
+        self.index = index
+        self.from_address = from_address
+        self.to_address = to_address
+        self.value = value
+        self.contract_address = contract_address
+        self.token_id = token_id
+        self.source = source
+        self.ordinal = 0
+
+    def key(self) -> tuple:
+        """Key for de-duplication
+        """
+        if self.kind == 'tx':
+            return (self.hash, self.kind)
+        if self.kind == 'internal':
+            return (self.hash, self.kind, self.index)
+        return self.transfer_key() + (self.ordinal,)
+
+    def transfer_key(self) -> tuple:
+        """Fields of a token transfer which all sources return
+        """
+        return (self.hash, self.kind, self.contract_address, self.token_id,
+                self.from_address, self.to_address)
+
+    def __repr__(self):
+        return 'StreamTxn(%s)' % ', '.join('%s=%r' % (name, getattr(self, name))
+                                           for name in self.__slots__)
+
+
+def from_record(record, source: str) -> StreamTxn:
+    """Normalize a typed record of TxnRecords (Etherscan or Moralis)
+    """
+    kind = RECORD_KINDS[type(record)]
+    index = None
+    if kind == 'internal':
+        index = record.trace_id
+    elif kind in ('erc20', 'nft'):
+        index = record.log_index
+    return StreamTxn(record.block, record.timestamp, record.hash, kind, index,
+                     record.from_address, record.to_address, record.value,
+                     getattr(record, 'contract_address', None),
+                     getattr(record, 'token_id', None), source)
+
+
+def from_block_tx(tx: dict, source: str = 'w3') -> StreamTxn:
+    """Normalize a transaction of a raw block (JSON-RPC or Web3 fields)
+    """
+    return StreamTxn(quantity_to_int(tx['blockNumber']), None, hex_to_bytes(tx['hash']), 'tx',
+                     None, hex_to_bytes(tx['from']), hex_to_bytes(tx.get('to')),
+                     quantity_to_int(tx['value']), None, None, source)
+
+
+def iter_records(records, source: str):
+    """Stream of typed records, in block order
+    """
+    for record in records:
+        yield from_record(record, source)
+
+
+def open_text(path: str):
+    """Open a (gzip or zstd compressed) text file
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError('zstd compression needs the zstandard package')
+        return zstandard.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_json_lines(path: str, source: str = 'w3'):
+    """Stream of the raw block transactions of a JSON lines file (ScanOutput)
+    """
+    with open_text(path) as ifile:
+        for line in ifile:
+            if line.strip():
+                yield from_block_tx(json.loads(line), source)
+
+
+class TxnMerger():
+    """
+    Merge block ordered streams into one stream without duplicates
+
+    window_blocks = number of blocks a key is kept in the index
+    max_keys = maximum number of keys in the index, the oldest keys are removed first
+    """
+
+    def __init__(self, window_blocks: int = 64, max_keys: int = 1000000):
+        self.window_blocks = window_blocks
+        self.max_keys = max_keys
+        self.index = {}
+        self.order = deque()
+        self.duplicates = 0
+        self.emitted = 0
+
+    def _expire(self, block: int):
+        """Remove keys of blocks before the window, and the oldest keys above max_keys
+        """
+        order = self.order
+        while order and (order[0][0] < block - self.window_blocks or
+                         len(order) > self.max_keys):
+            _, key = order.popleft()
+            del self.index[key]
+
+    def merge(self, *streams):
+        """Merge the streams, yields StreamTxn in block order
+
+        streams = iterables of StreamTxn in block order, in order of preference
+        """
+        ranked = [self._ranked(stream, rank) for rank, stream in enumerate(streams)]
+        for _, txn in heapq.merge(*ranked, key=lambda item: item[0]):
+            self._expire(txn.block)
+            key = txn.key()
+            if key in self.index:
+                self.duplicates += 1
+                continue
+            self.index[key] = txn.block
+            self.order.append((txn.block, key))
+            self.emitted += 1
+            yield txn
+
+    @staticmethod
+    def _ranked(stream, rank: int):
+        """Stream with the sort key (block, source rank)
+
+        The ordinal of the token transfers is set, counted per block
+        """
+        block = None
+        counts = {}
+        for txn in stream:
+            if txn.block != block:
+                block = txn.block
+                counts = {}
+            if txn.kind in ('erc20', 'nft'):
+                transfer_key = txn.transfer_key()
+                txn.ordinal = counts.get(transfer_key, 0)
+                counts[transfer_key] = txn.ordinal + 1
+            yield (txn.block, rank), txn
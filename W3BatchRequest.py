@@ -0,0 +1,192 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Send JSON-RPC calls in batches to a http provider
+
+A batch packs N calls in one http POST, the provider replies with an array
+of results. The replies are matched on id, so results are returned in the
+same order as the calls.
+When the provider rejects a batch as too large (413 or an error about the
+batch size), the batch size is halved and the batch is sent again.
+A 429 (rate limit) pauses the rate limiter of the host for the Retry-After
+time and the same batch is sent again, other http errors are raised.
+With a W3ProviderPool as endpoint, each batch is sent to an endpoint selected
+by the pool, a failed batch is sent again to another endpoint.
+"""
+import itertools
+import json
+import re
+import time
+
+import requests
+
+from RequestHelper import RequestHelper, get_rate_limiter, retry_after_time
+
+# error messages of providers on a batch above their limit
+BATCH_SIZE_ERROR = re.compile(r'batch|too large|size|payload', re.IGNORECASE)
+
+
+def quantity_to_int(value) -> int:
+    """Convert a JSON-RPC quantity (hex string) to an integer
+    """
+    if isinstance(value, str):
+        return int(value, 16)
+    return value
+
+
+class BatchTooLarge(Exception):
+    """The provider rejected the batch because of its size"""
+
+
+class RateLimited(Exception):
+    """The provider replied 429 Too Many Requests"""
+
+    def __init__(self, response):
+        super().__init__('429 Too Many Requests')
+        self.response = response
+
+
+def is_batch_size_error(error) -> bool:
+    """Error (message or error object) of a provider about the size of a batch
+    """
+    return BATCH_SIZE_ERROR.search(str(error)) is not None
+
+
+class BatchRpcClient():
+    """
+    JSON-RPC client for batches of calls
+
+    endpoint = url of the http provider or a W3ProviderPool
+    batch_size = maximum number of calls per http request
+    min_batch_size = batch size from which a rejected batch is not split anymore
+    """
+
+    def __init__(self, endpoint, batch_size: int = 50, min_batch_size: int = 1,
+                 timeout: int = 120):
+        if isinstance(endpoint, str):
+            self.endpoint_uri = endpoint
+            self.pool = None
+        else:
+            self.endpoint_uri = None
+            self.pool = endpoint
+        self.batch_size = max(1, batch_size)
+        self.min_batch_size = max(1, min_batch_size)
+        self.timeout = timeout
+        # with a pool a failed batch goes to the next endpoint, instead of retrying the same one
+        self.session = requests.Session() if self.pool else RequestHelper._init_session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.request_id = itertools.count(1)
+        self.http_requests = 0
+        self.bytes_received = 0
+
+    def request(self, calls: list, raise_errors: bool = True) -> list:
+        """Send all calls and return the results in order of the calls
+
+        calls = list of tuples (method, params)
+        raise_errors = a call returning an error raises a ValueError, else the
+        ValueError is returned as result of that call (eth_call that reverts)
+        """
+        results = []
+        idx = 0
+        failed = []
+        retry = 0
+        while idx < len(calls):
+            batch = calls[idx:idx + self.batch_size]
+            endpoint = self.pool.select(exclude=failed) if self.pool else None
+            try:
+                results.extend(self._post_batch(batch, endpoint, raise_errors))
+            except requests.exceptions.RequestException:
+                if self.pool is None or len(failed) + 1 >= len(self.pool.endpoints):
+                    raise
+                failed.append(endpoint)
+                continue
+            except RateLimited as e:
+                retry += 1
+                if retry > RequestHelper.retry_429:
+                    raise requests.exceptions.RequestException(response=e.response)
+                sleep_time = retry_after_time(e.response, retry)
+                print('429 Too Many Requests, retrying in %s s' % (sleep_time))
+                # pause the shared bucket of the host, other clients wait too
+                limiter = get_rate_limiter(e.response.url, create=True)
+                limiter.pause(sleep_time)
+                limiter.acquire()
+                continue
+            except BatchTooLarge:
+                if len(batch) <= self.min_batch_size:
+                    raise
+                self.batch_size = max(self.min_batch_size, min(self.batch_size, len(batch) // 2))
+                print('Batch of %d calls rejected, batch size reduced to %d' %
+                      (len(batch), self.batch_size))
+                continue
+            idx += len(batch)
+            failed = []
+            retry = 0
+        return results
+
+    def _post_batch(self, batch: list, endpoint=None, raise_errors: bool = True) -> list:
+        """Post one batch and decode the array reply
+
+        endpoint = endpoint of the pool to send the batch to
+        raise_errors = raise or return the error of a call
+        """
+        payload = []
+        for method, params in batch:
+            payload.append({'jsonrpc': '2.0', 'id': next(self.request_id),
+                            'method': method, 'params': params})
+
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                endpoint.uri if endpoint else self.endpoint_uri,
+                data=json.dumps(payload), timeout=self.timeout)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if endpoint:
+                self.pool.report(endpoint, time.monotonic() - start, False)
+            raise
+        if endpoint:
+            self.pool.report(endpoint, time.monotonic() - start, True)
+        self.http_requests += 1
+        self.bytes_received += len(response.content)
+
+        if response.status_code == 429:
+            raise RateLimited(response)
+        if response.status_code == 413:
+            raise BatchTooLarge(response.text)
+        if response.status_code >= 400:
+            # some providers reply 400 with (plain text) an error about the batch size
+            if len(batch) > 1 and is_batch_size_error(response.text):
+                raise BatchTooLarge(response.text)
+            response.raise_for_status()
+        reply = response.json()
+
+        # an object instead of an array is an error for the whole batch
+        if not isinstance(reply, list):
+            if len(batch) > 1:
+                error = reply.get('error', reply)
+                if is_batch_size_error(error):
+                    raise BatchTooLarge(error)
+                raise ValueError(error)
+            reply = [reply]
+        if len(reply) < len(payload) and len(batch) > 1:
+            raise BatchTooLarge('Only %d of %d replies' % (len(reply), len(payload)))
+
+        replies = {item.get('id'): item for item in reply}
+        results = []
+        for call in payload:
+            item = replies.get(call['id'])
+            if item is None:
+                raise ValueError('No reply for call %s' % (call,))
+            if 'error' in item:
+                # some providers only answer the calls above their limit with an error
+                if len(batch) > 1 and 'batch' in str(item['error']).lower():
+                    raise BatchTooLarge(item['error'])
+                if raise_errors:
+                    raise ValueError(item['error'])
+                results.append(ValueError(item['error']))
+                continue
+            results.append(item['result'])
+        return results
@@ -0,0 +1,180 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Scan a range of blocks through a Web3 http provider
+
+The range [start_block, end_block) is split in chunks, which are fetched
+by a pool of worker threads. The chunks are handed back in block order,
+so results can be written in the same order as a sequential scan.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+from W3BatchRequest import BatchRpcClient
+
+
+class Web3BlockSource():
+    """
+    Fetch blocks one by one through the provider of a Web3 instance
+
+    Blocks are returned as the raw JSON-RPC result (hex strings),
+    so they can be written directly to a json file
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+
+    def get_block(self, block_number: int, full_transactions=True) -> dict:
+        """Get one block
+
+        block_number = number of the block
+        full_transactions = include full transactions or only the hashes
+        """
+        resp = self.w3.provider.make_request(
+            'eth_getBlockByNumber', [hex(block_number), full_transactions])
+        if 'error' in resp:
+            raise ValueError(resp['error'])
+        return resp['result']
+
+    def get_blocks(self, start_block: int, end_block: int, full_transactions=True) -> list:
+        """Get all blocks in the range [start_block, end_block)
+        """
+        return self.get_blocks_by_number(range(start_block, end_block), full_transactions)
+
+    def get_blocks_by_number(self, block_numbers, full_transactions=True) -> list:
+        """Get the blocks with the given numbers
+        """
+        return [self.get_block(idx, full_transactions) for idx in block_numbers]
+
+    def get_logs(self, block_hashes: list) -> list:
+        """Get the logs of the blocks with the given hashes, one list per block
+        """
+        logs = []
+        for block_hash in block_hashes:
+            resp = self.w3.provider.make_request('eth_getLogs', [{'blockHash': block_hash}])
+            if 'error' in resp:
+                raise ValueError(resp['error'])
+            logs.append(resp['result'])
+        return logs
+
+
+class BatchBlockSource():
+    """
+    Fetch blocks with JSON-RPC batch requests, one http request per batch
+
+    endpoint = url of the http provider or a W3ProviderPool
+    batch_size = number of blocks per batch, is reduced when the provider
+                 rejects a batch as too large
+    """
+
+    def __init__(self, endpoint, batch_size: int = 50):
+        self.client = BatchRpcClient(endpoint, batch_size)
+
+    def get_blocks(self, start_block: int, end_block: int, full_transactions=True) -> list:
+        """Get all blocks in the range [start_block, end_block)
+        """
+        return self.get_blocks_by_number(range(start_block, end_block), full_transactions)
+
+    def get_blocks_by_number(self, block_numbers, full_transactions=True) -> list:
+        """Get the blocks with the given numbers
+        """
+        calls = [('eth_getBlockByNumber', [hex(idx), full_transactions])
+                 for idx in block_numbers]
+        return self.client.request(calls)
+
+    def get_logs(self, block_hashes: list) -> list:
+        """Get the logs of the blocks with the given hashes, one list per block
+        """
+        return self.client.request([('eth_getLogs', [{'blockHash': block_hash}])
+                                    for block_hash in block_hashes])
+
+
+class BlockScanner():
+    """
+    Fetch a range of blocks in chunks with a pool of workers
+
+    source = block source with a get_blocks(start_block, end_block) function
+    workers = number of worker threads
+    chunk_size = number of blocks per chunk (one job for a worker)
+    """
+
+    def __init__(self, source, workers: int = 4, chunk_size: int = 10):
+        self.source = source
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+
+    def iter_chunks(self, start_block: int, end_block: int):
+        """Fetch all blocks in the range [start_block, end_block)
+
+        yields (chunk_start, chunk_end, blocks) in block order
+        At most 2 chunks per worker are fetched ahead of the consumer
+        """
+        chunks = ((idx, min(idx + self.chunk_size, end_block))
+                  for idx in range(start_block, end_block, self.chunk_size))
+        progress = ScanProgress(start_block, end_block)
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for chunk in chunks:
+                pending.append(
+                    (chunk, executor.submit(self.source.get_blocks, *chunk)))
+                if len(pending) >= 2 * self.workers:
+                    yield self._next_chunk(pending, progress)
+            while pending:
+                yield self._next_chunk(pending, progress)
+        progress.finish()
+
+    @staticmethod
+    def _next_chunk(pending: deque, progress):
+        """Wait for the oldest pending chunk
+        """
+        (chunk_start, chunk_end), future = pending.popleft()
+        blocks = future.result()
+        progress.update(chunk_end)
+        return chunk_start, chunk_end, blocks
+
+
+class ScanProgress():
+    """
+    Print a progress line with the number of blocks per second
+
+    The line is overwritten, at most once per interval seconds
+    """
+
+    def __init__(self, start_block: int, end_block: int, interval: float = 1.0):
+        self.start_block = start_block
+        self.end_block = end_block
+        self.interval = interval
+        self.start_time = time.monotonic()
+        self.last_print = 0.0
+        self.block = start_block
+
+    def update(self, block: int):
+        """Set the progress to block (exclusive)
+        """
+        self.block = block
+        now = time.monotonic()
+        if now - self.last_print >= self.interval:
+            self.last_print = now
+            self.print_line(now)
+
+    def print_line(self, now: float):
+        """Print the progress line
+        """
+        elapsed = max(now - self.start_time, 1e-9)
+        done = self.block - self.start_block
+        total = max(self.end_block - self.start_block, 1)
+        print('\rBlock %d, remaining: %d, progress: %d%%, %.1f blocks/s' % (
+            self.block, self.end_block - self.block, 100 * done / total, done / elapsed),
+            end='', flush=True)
+
+    def finish(self):
+        """Print the final progress line
+        """
+        self.print_line(time.monotonic())
+        print()
+        sys.stdout.flush()
@@ -11,10 +11,14 @@ import config
 from web3 import Web3
 import sys
 
+from BalanceService import RpcBalanceService
+
 
 def __main__():
     """Get native balance of an address on the ETH and BSC chain
     Through a Web3 HTTP provider
+
+    The balances of all addresses are requested in JSON-RPC batches per chain
     """
     w3_eth = Web3(Web3.HTTPProvider(config.ETH_HTTP_PROVIDER))
     w3_bsc = Web3(Web3.HTTPProvider(config.BSC_HTTP_PROVIDER))
@@ -24,15 +28,13 @@ def __main__():
     if (not w3_bsc.isConnected()):
         sys.exit('No binance smart chain provider, Web3 disconnected')
     
-    lst_addr_eth = config.ETH_ADDRESS
-    
-    for addr in lst_addr_eth:
-        addrh = Web3.toChecksumAddress(addr)
+    lst_addr_eth = [Web3.toChecksumAddress(addr) for addr in config.ETH_ADDRESS]
+    balances_eth = RpcBalanceService(config.ETH_HTTP_PROVIDER).get_balances(lst_addr_eth)
+    balances_bsc = RpcBalanceService(config.BSC_HTTP_PROVIDER).get_balances(lst_addr_eth)
     
-        balance_eth_wei = w3_eth.eth.get_balance(addrh)
-        balance_eth = Web3.fromWei(balance_eth_wei,'ether')
-        balance_bnb_wei = w3_bsc.eth.get_balance(addrh)
-        balance_bnb = Web3.fromWei(balance_bnb_wei,'ether')
+    for addrh in lst_addr_eth:
+        balance_eth = Web3.fromWei(balances_eth[addrh],'ether')
+        balance_bnb = Web3.fromWei(balances_bsc[addrh],'ether')
     
         print('Address: ' + addrh)
         print('ETH Balance: ' + str(balance_eth))
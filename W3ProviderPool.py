@@ -0,0 +1,148 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Pool of http providers, usable as a Web3 provider
+
+Requests are spread over the endpoints, weighted by the measured latency
+and error rate of each endpoint. An endpoint which fails a number of times
+in a row is ejected from the pool, after probe_interval seconds one request
+is sent to it again to probe if it is back.
+
+usage:
+    w3 = Web3(W3ProviderPool(config.ETH_HTTP_PROVIDERS))
+"""
+import random
+import threading
+import time
+
+from web3.providers import BaseProvider, HTTPProvider
+
+
+class PoolEndpoint():
+    """
+    One endpoint of the pool with its measured health
+
+    latency and error_rate are exponential moving averages
+    """
+
+    def __init__(self, uri: str, request_kwargs: dict = None):
+        self.uri = uri
+        self.provider = HTTPProvider(uri, request_kwargs=request_kwargs)
+        self.latency = 1.0
+        self.error_rate = 0.0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def weight(self) -> float:
+        """Share of the requests for this endpoint
+        """
+        return (1.0 - min(self.error_rate, 0.95)) / max(self.latency, 0.001)
+
+
+class W3ProviderPool(BaseProvider):
+    """
+    Web3 provider which spreads requests over a pool of http endpoints
+
+    endpoint_uris = list of http provider urls
+    eject_after = number of failures in a row before an endpoint is ejected
+    probe_interval = seconds before an ejected endpoint is probed again
+    request_kwargs = extra arguments for the http requests (timeout, ...)
+    """
+
+    alpha = 0.2
+
+    def __init__(self, endpoint_uris: list, eject_after: int = 3, probe_interval: float = 30,
+                 request_kwargs: dict = None):
+        if not endpoint_uris:
+            raise ValueError('No endpoints for the provider pool')
+        self.endpoints = [PoolEndpoint(uri, request_kwargs) for uri in endpoint_uris]
+        self.eject_after = eject_after
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+
+    def select(self, exclude: list = ()) -> PoolEndpoint:
+        """Select an endpoint for the next request
+
+        An ejected endpoint gets one probe request after probe_interval,
+        when all endpoints are ejected the one which is ejected the longest is used
+
+        exclude = endpoints which already failed for this request
+        """
+        now = time.monotonic()
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            healthy = []
+            for endpoint in candidates:
+                if endpoint.ejected_until == 0.0:
+                    healthy.append(endpoint)
+                elif endpoint.ejected_until <= now and not endpoint.probing:
+                    endpoint.probing = True
+                    return endpoint
+            if not healthy:
+                return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+            return random.choices(healthy, weights=[endpoint.weight() for endpoint in healthy])[0]
+
+    def report(self, endpoint: PoolEndpoint, latency: float, success: bool):
+        """Update the health of an endpoint after a request
+        """
+        with self.lock:
+            endpoint.requests += 1
+            endpoint.probing = False
+            endpoint.error_rate += self.alpha * ((0.0 if success else 1.0) - endpoint.error_rate)
+            if success:
+                endpoint.latency += self.alpha * (latency - endpoint.latency)
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+            else:
+                endpoint.errors += 1
+                endpoint.failures += 1
+                if endpoint.failures >= self.eject_after:
+                    if endpoint.ejected_until == 0.0:
+                        print('Provider %s ejected after %d failures' %
+                              (endpoint.uri, endpoint.failures))
+                    endpoint.ejected_until = time.monotonic() + self.probe_interval
+
+    def make_request(self, method, params):
+        """Send a request to one of the endpoints, on a failure the request
+        is sent to the next selected endpoint
+        """
+        failed = []
+        while True:
+            endpoint = self.select(exclude=failed)
+            start = time.monotonic()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except Exception:
+                self.report(endpoint, time.monotonic() - start, False)
+                failed.append(endpoint)
+                if len(failed) >= len(self.endpoints):
+                    raise
+                continue
+            self.report(endpoint, time.monotonic() - start, True)
+            return response
+
+    def isConnected(self) -> bool:
+        """True when at least one endpoint is connected
+        """
+        connected = False
+        for endpoint in self.endpoints:
+            if endpoint.provider.isConnected():
+                connected = True
+            else:
+                self.report(endpoint, 0.0, False)
+        return connected
+
+    def summary(self) -> str:
+        """Requests, errors and latency per endpoint
+        """
+        lines = []
+        for endpoint in self.endpoints:
+            lines.append('%s: %d requests, %d errors, latency %.3f s%s' % (
+                endpoint.uri, endpoint.requests, endpoint.errors, endpoint.latency,
+                ', ejected' if endpoint.ejected_until else ''))
+        return '\n'.join(lines)
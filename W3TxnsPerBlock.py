@@ -4,19 +4,24 @@ Created on Feb 11, 2022
 @author: arno
 
 Get all transactions of an eth address by fetching all blocks
-through Web3 hhtp provider
+through Web3 hhtp provider, in JSON-RPC batches of blocks
 Is very slow
 result is written to json file
 
 same as W3TxnsPerBlockArgs but without args example
 """
 #!/usr/bin/python
+import os
 import sys
-import json
 import config
 
 from web3 import Web3
-from hexbytes import HexBytes
+
+from AddressMatcher import AddressMatcher
+from BlockCache import BlockCache, CachedBlockSource
+from ScanOutput import SingleFileOutput
+from W3BlockScanner import BatchBlockSource, BlockScanner
+from W3ProviderPool import W3ProviderPool
 
 # Exports transactions to a JSON file where each line
 # contains the data returned from the JSONRPC interface
@@ -26,19 +31,6 @@ from hexbytes import HexBytes
 
 
 
-def tx_to_json(tx):
-    """Transform a dict to a Json
-    In case the values are HexBytes convert to normal hex values 
-    """
-    result = {}
-    for key, val in tx.items():
-        if isinstance(val, HexBytes):
-            result[key] = val.hex()
-        else:
-            result[key] = val
-
-    return json.dumps(result)
-
 def __main__():
     """Exports transactions to a JSON file where each line
     contains the data returned from the JSONRPC interface
@@ -60,31 +52,31 @@ def __main__():
     start_block = 1
     end_block = w3.eth.blockNumber
 
-    address_lowercase = config.ETH_ADDRESS[3].lower()
-
-    ofile = open('transactions.json', 'w')
-
-    for idx in range(start_block, end_block):
-        print('Fetching block %d, remaining: %d, progress: %d%%'%(
-            idx, (end_block-idx), 100*(idx-start_block)/(end_block-start_block)))
-
-        block = w3.eth.getBlock(idx, full_transactions=True)
-
-        for tx in block.transactions:
-            if tx['to']:
-                to_matches = tx['to'].lower() == address_lowercase
-            else:
-                to_matches = False
-
-            if tx['from']:
-                from_matches = tx['from'].lower() == address_lowercase
-            else:
-                from_matches = False
-
-            if to_matches or from_matches:
-                print('Found transaction with hash %s'%tx['hash'].hex())
-                ofile.write(tx_to_json(tx)+'\n')
-                ofile.flush()
+    # all addresses are matched in one pass
+    matcher = AddressMatcher(config.ETH_ADDRESS)
+
+    # buffered output, written to the file when the buffer is full
+    output = SingleFileOutput('transactions.json')
+    output.resume()
+
+    # finalized blocks are read from the local block cache on a next run
+    cache = BlockCache(os.path.join(config.OUTPUT_PATH, 'blocks.db'))
+    # batches are spread over all ethereum providers
+    pool = W3ProviderPool(config.ETH_HTTP_PROVIDERS)
+    source = CachedBlockSource(BatchBlockSource(pool, batch_size=50), cache, end_block)
+    scanner = BlockScanner(source, workers=len(pool.endpoints), chunk_size=50)
+
+    for _, _, blocks in scanner.iter_chunks(start_block, end_block):
+        for block in blocks:
+            for tx in block['transactions']:
+                for address in matcher.match(tx):
+                    print('\nFound transaction with hash %s'%tx['hash'])
+                    output.write(address, tx)
+
+    output.close()
+    print(cache.report())
+    cache.close()
+    print(pool.summary())
 
 if __name__ == '__main__':
     __main__()
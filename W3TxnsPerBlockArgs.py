@@ -5,19 +5,26 @@ Created on Feb 11, 2022
 
 Get all transactions of an eth address by fetching all blocks
 through Web3 hhtp provider
-Is very slow
+Is very slow, use --workers to fetch chunks of blocks concurrently
 result is written to json file
 
 same as W3TxnsPerBlock but with args example
 """
 #!/usr/bin/python
 import argparse
-import json
 import sys
+import time
 import config
 
 from web3 import Web3
-from hexbytes import HexBytes
+
+from AddressMatcher import AddressMatcher, read_address_file
+from BlockCache import BlockCache, CachedBlockSource
+from LogsBloom import BloomFilter, BloomFilteredSource
+from ScanCheckpoint import ScanCheckpoint
+from ScanOutput import AddressFileOutput, SingleFileOutput
+from W3BlockScanner import BatchBlockSource, BlockScanner, Web3BlockSource
+from W3ProviderPool import W3ProviderPool
 
 # Exports transactions to a JSON file where each line
 # contains the data returned from the JSONRPC interface
@@ -26,31 +33,44 @@ from hexbytes import HexBytes
 # address. You can modify it to suit your needs.
 
 
+# the providers are needed before parsing all args, for the default end block
+provider_parser = argparse.ArgumentParser(add_help=False)
+provider_parser.add_argument('-p', '--provider', type=str, action='append',
+                             help='Http provider url (repeatable), default config.ETH_HTTP_PROVIDERS')
+pre_args, _ = provider_parser.parse_known_args()
+
 # provider = Web3.HTTPProvider('https://mainnet.infura.io/')
-provider = Web3.HTTPProvider(config.ETH_HTTP_PROVIDER)
+# requests are spread over all providers, a failing provider is ejected from the pool
+provider = W3ProviderPool(pre_args.provider or config.ETH_HTTP_PROVIDERS)
 w3 = Web3(provider)
 if (not w3.isConnected()):
     sys.exit('No ethereum provider, Web3 disconnected')
 
 
-parser = argparse.ArgumentParser()
-parser.add_argument('addr', type=str, help='Address to print the transactions for')
-parser.add_argument('-o', '--output', type=str, help='Path to the output JSON file', required=True)
+parser = argparse.ArgumentParser(parents=[provider_parser])
+parser.add_argument('addr', type=str, nargs='?', help='Address to print the transactions for')
+parser.add_argument('-a', '--address-file', type=str, help='File with addresses to print the transactions for, one per line')
+parser.add_argument('--config-addresses', action='store_true', help='Print the transactions for all addresses in config.ETH_ADDRESS')
+parser.add_argument('-o', '--output', type=str, help='Path to the output JSON file (or folder with --split)', required=True)
+parser.add_argument('--split', action='store_true', help='Write one JSON file per address in the output folder')
 parser.add_argument('-s', '--start-block', type=int, help='Start block', default=0)
 parser.add_argument('-e', '--end-block',  type=int, help='End block', default=w3.eth.blockNumber)
-
-def tx_to_json(tx):
-    """Transform a dict to a Json
-    In case the values are HexBytes convert to normal hex values 
-    """
-    result = {}
-    for key, val in tx.items():
-        if isinstance(val, HexBytes):
-            result[key] = val.hex()
-        else:
-            result[key] = val
-
-    return json.dumps(result)
+parser.add_argument('-w', '--workers', type=int, help='Number of concurrent workers', default=4)
+parser.add_argument('-c', '--chunk-size', type=int, help='Number of blocks per worker job (default 10 or the batch size)')
+parser.add_argument('-b', '--batch-size', type=int, help='Number of blocks per JSON-RPC batch request (0 = no batches)', default=0)
+parser.add_argument('--bloom', action='store_true',
+                    help='Fetch headers first and only fetch blocks and logs of which the logsBloom might match '
+                         '(finds token transfers from the logs, misses plain ether transfers)')
+parser.add_argument('-t', '--token', type=str, action='append', default=[],
+                    help='With --bloom only match token transfers of this contract address (repeatable)')
+parser.add_argument('--cache', type=str, help='Path to a sqlite block cache, blocks are read from it first')
+parser.add_argument('--cache-size', type=int, help='Maximum size of the block cache in MB', default=1024)
+parser.add_argument('-z', '--compress', choices=['gzip', 'zstd'], help='Compress the output files')
+parser.add_argument('--rotate-mb', type=int, help='Start a new output file after this size in MB')
+parser.add_argument('--rotate-blocks', type=int, help='Start a new output file every number of blocks')
+parser.add_argument('-r', '--resume', action='store_true', help='Resume the scan from the checkpoint file')
+parser.add_argument('--checkpoint', type=str, help='Path to the checkpoint file (default output file + .checkpoint)')
+parser.add_argument('--checkpoint-interval', type=float, help='Seconds between checkpoints', default=10)
 
 def __main__():
     """Exports transactions to a JSON file where each line
@@ -64,31 +84,94 @@ def __main__():
     start_block = args.start_block
     end_block = args.end_block
 
-    address_lowercase = args.addr.lower()
-
-    ofile = open(args.output, 'w')
-
-    for idx in range(start_block, end_block):
-        print('Fetching block %d, remaining: %d, progress: %d%%'%(
-            idx, (end_block-idx), 100*(idx-start_block)/(end_block-start_block)))
-
-        block = w3.eth.getBlock(idx, full_transactions=True)
-
-        for tx in block.transactions:
-            if tx['to']:
-                to_matches = tx['to'].lower() == address_lowercase
-            else:
-                to_matches = False
-
-            if tx['from']:
-                from_matches = tx['from'].lower() == address_lowercase
-            else:
-                from_matches = False
-
-            if to_matches or from_matches:
-                print('Found transaction with hash %s'%tx['hash'].hex())
-                ofile.write(tx_to_json(tx)+'\n')
-                ofile.flush()
+    addresses = []
+    if args.addr:
+        addresses.append(args.addr)
+    if args.address_file:
+        addresses.extend(read_address_file(args.address_file))
+    if args.config_addresses:
+        addresses.extend(config.ETH_ADDRESS)
+    if not addresses:
+        parser.error('No address given, use addr, --address-file or --config-addresses')
+    matcher = AddressMatcher(addresses)
+    if args.split and (args.rotate_mb or args.rotate_blocks):
+        parser.error('--rotate-mb and --rotate-blocks can not be used with --split')
+    if args.rotate_mb and args.rotate_blocks:
+        parser.error('--rotate-mb and --rotate-blocks can not be used together')
+
+    if args.split:
+        output = AddressFileOutput(args.output, args.compress)
+    else:
+        output = SingleFileOutput(args.output, address_column=len(matcher) > 1,
+                                  compression=args.compress,
+                                  rotate_bytes=args.rotate_mb and args.rotate_mb * 1024**2,
+                                  rotate_blocks=args.rotate_blocks)
+
+    checkpoint = ScanCheckpoint(args.checkpoint or args.output.rstrip('/\\') + '.checkpoint',
+                                {'addresses': matcher.digest(), 'split': args.split,
+                                 # the output format and the matched transactions must not change
+                                 'compress': args.compress, 'rotate_mb': args.rotate_mb,
+                                 'rotate_blocks': args.rotate_blocks, 'bloom': args.bloom,
+                                 'tokens': sorted(token.lower() for token in args.token)})
+    offsets = None
+    if args.resume:
+        try:
+            state = checkpoint.load()
+        except ValueError as e:
+            sys.exit(e)
+        if state:
+            start_block = state['last_block'] + 1
+            offsets = state['outputs']
+            print('Resuming from block %d' % start_block)
+
+    output.resume(offsets)
+    last_commit = time.monotonic()
+
+    if args.batch_size > 0:
+        source = BatchBlockSource(provider, args.batch_size)
+        chunk_size = args.chunk_size or args.batch_size
+    else:
+        source = Web3BlockSource(w3)
+        chunk_size = args.chunk_size or 10
+    fetch_source = source
+    if args.cache:
+        cache = BlockCache(args.cache, args.cache_size * 1024**2)
+        source = CachedBlockSource(source, cache, w3.eth.blockNumber)
+    if args.bloom:
+        source = BloomFilteredSource(source, BloomFilter(matcher.addresses, args.token), fetch_source)
+    scanner = BlockScanner(source, args.workers, chunk_size)
+
+    for _, chunk_end, blocks in scanner.iter_chunks(start_block, end_block):
+        for block in blocks:
+            block_matched = False
+            matched_logs = block.get('matched_logs', {})
+            for tx in block['transactions']:
+                matches = matcher.match(tx)
+                logs = matched_logs.get(tx['hash'])
+                if logs:
+                    # token transfers of the transaction, with the matching logs
+                    matches += [address for address in source.match_tx_logs(logs)
+                                if address not in matches]
+                    tx = dict(tx, logs=logs)
+                if matches:
+                    print('\nFound transaction with hash %s'%tx['hash'])
+                    block_matched = True
+                for address in matches:
+                    output.write(address, tx)
+            if args.bloom and block_matched:
+                source.add_matched_block()
+
+        if time.monotonic() - last_commit >= args.checkpoint_interval or chunk_end == end_block:
+            checkpoint.commit(chunk_end - 1, output.commit())
+            last_commit = time.monotonic()
+
+    output.close()
+    if args.bloom:
+        print(source.summary())
+    if args.cache:
+        print(cache.report())
+        cache.close()
+    print(provider.summary())
 
 if __name__ == '__main__':
     __main__()
@@ -7,9 +7,12 @@ Collecting prices
 
 CCXT
 """
+import asyncio
+
 import ccxt
 
 #import ccxt.async_support as ccxt
+import AsyncRequestHelper
 import RequestHelper
 
 
@@ -37,6 +40,17 @@ def test_api():
     print(resp)
 
 
+async def test_api_async():
+    # init async request helper class, all requests in flight at once
+    api_url = 'https://api.waves.exchange'
+    get_urls = ['/v1/platforms', '/v1/assets', '/v1/networks']
+    async with AsyncRequestHelper.AsyncRequestHelper() as req:
+        resps = await asyncio.gather(
+            *[req.get_request_response(api_url+get_url) for get_url in get_urls])
+    for resp in resps:
+        print(resp)
+
+
 def __main__():
     """
     Get Waves Exchange price history
@@ -20,6 +20,8 @@ ETH_ADDRESS = ['0x2c1ba59d6f58433fb1eaee7d20b26ed83bda51a3', # internal tx
 # look at ethereumnodes.com
 ETH_HTTP_PROVIDER = 'https://mainnet.eth.cloud.ava.do/'
 ETH_HTTP_PROVIDER2 = 'https://api.mycryptoapi.com/eth'
+# providers used together by the W3ProviderPool
+ETH_HTTP_PROVIDERS = [ETH_HTTP_PROVIDER, ETH_HTTP_PROVIDER2]
 BSC_HTTP_PROVIDER = 'https://bsc-dataseed1.binance.org:443'
 
 ETHERSCAN_API = '' # Your Etherscan API
@@ -0,0 +1,39 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Tests of the proxy storage slots of ProxyResolver
+
+usage:
+    python -m unittest test_ProxyResolver
+"""
+import unittest
+
+from sha3 import keccak_256
+
+from ProxyResolver import BEACON_SLOT, IMPLEMENTATION_SLOT, IMPLEMENTATION_CALL, PROXIABLE_SLOT
+
+
+def keccak_int(text: str) -> int:
+    return int(keccak_256(text.encode('utf-8')).hexdigest(), 16)
+
+
+class TestProxySlots(unittest.TestCase):
+
+    def test_eip1967_implementation_slot(self):
+        self.assertEqual(int(IMPLEMENTATION_SLOT, 16),
+                         keccak_int('eip1967.proxy.implementation') - 1)
+
+    def test_eip1967_beacon_slot(self):
+        self.assertEqual(int(BEACON_SLOT, 16), keccak_int('eip1967.proxy.beacon') - 1)
+
+    def test_eip1822_proxiable_slot(self):
+        self.assertEqual(int(PROXIABLE_SLOT, 16), keccak_int('PROXIABLE'))
+
+    def test_implementation_selector(self):
+        self.assertEqual(IMPLEMENTATION_CALL, '0x' + keccak_256(b'implementation()').hexdigest()[:8])
+
+
+if __name__ == '__main__':
+    unittest.main()
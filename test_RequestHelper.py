@@ -0,0 +1,45 @@
+"""
+Created on Oct 18, 2026
+
+@author: arno
+
+Tests of the incremental json parser of RequestHelper
+
+usage:
+    python -m unittest test_RequestHelper
+"""
+import unittest
+
+from RequestHelper import iter_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_number_split_after_dot(self):
+        chunks = [b'{', b'"result": [123, 4.', b'5, "str"]}']
+        self.assertEqual(list(iter_json_array(chunks)), [123, 4.5, 'str'])
+
+    def test_number_split_in_exponent(self):
+        cases = [([b'{"result":[1e', b'3]}'], [1000.0]),
+                 ([b'{"result":[1E-', b'3]}'], [0.001]),
+                 ([b'{"result":[12', b'34,5]}'], [1234, 5]),
+                 ([b'{"result":[-', b'7]}'], [-7])]
+        for chunks, expected in cases:
+            self.assertEqual(list(iter_json_array(chunks)), expected)
+
+    def test_single_byte_chunks(self):
+        data = b'{"status": "1", "result": [{"a": 1.25}, 2, -3e2, "x,]"]}'
+        chunks = [data[idx:idx + 1] for idx in range(len(data))]
+        self.assertEqual(list(iter_json_array(chunks)), [{'a': 1.25}, 2, -300.0, 'x,]'])
+
+    def test_missing_key(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"status": "0", "message": "NOTOK"}']))
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"result": "Max rate limit reached"}']))
+
+
+if __name__ == '__main__':
+    unittest.main()